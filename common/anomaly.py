@@ -0,0 +1,100 @@
+from datetime import datetime
+from statistics import median
+from typing import Iterable, NamedTuple, Optional
+
+SPIKE_FACTOR = 3  # во сколько раз расход должен превысить обычный
+MIN_SPIKE = 10  # расход меньше этого не считается скачком
+MIN_HISTORY = 3  # месяцев истории, нужных для оценки обычного расхода
+
+REASONS = {
+    "regression": "меньше предыдущих",
+    "spike": "резкий рост расхода",
+    "zero": "нулевой расход",
+}
+
+
+class Anomaly(NamedTuple):
+    apartment: Optional[int]
+    kind: str
+    value: int
+    previous: int
+    typical: Optional[float]
+    reason: str
+
+
+Point = tuple[datetime, int]
+
+
+def _months_between(start: datetime, end: datetime) -> int:
+    return max(1, (end.year - start.year) * 12 + end.month - start.month)
+
+
+def typical_consumption(points: list[Point]) -> Optional[float]:
+    """Медиана месячного расхода по истории показаний."""
+    deltas = [
+        (value - prev_value) / _months_between(prev_created, created)
+        for (prev_created, prev_value), (created, value) in zip(
+            points, points[1:]
+        )
+        if value >= prev_value
+    ]
+    if len(deltas) < MIN_HISTORY:
+        return None
+    return median(deltas)
+
+
+def check_value(
+    points: list[Point], created: datetime, value: int
+) -> tuple[Optional[str], Optional[float]]:
+    """Проверяет новое показание по истории points (от старых к новым).
+
+    Возвращает (причина, обычный расход); причина None - показание в норме.
+    """
+    points = [point for point in points if point[1] is not None]
+    if not points:
+        return None, None
+    prev_created, prev_value = points[-1]
+    typical = typical_consumption(points)
+    if value < prev_value:
+        return "regression", typical
+    if typical is None:
+        return None, None
+    delta = (value - prev_value) / _months_between(prev_created, created)
+    if delta == 0 and typical > 0:
+        return "zero", typical
+    if delta > max(typical * SPIKE_FACTOR, MIN_SPIKE):
+        return "spike", typical
+    return None, typical
+
+
+def find_anomalies(
+    rows: Iterable[tuple[Optional[int], datetime, dict[str, Optional[int]]]],
+    since: datetime,
+) -> list[Anomaly]:
+    """Ищет аномалии показаний, переданных начиная с since.
+
+    rows - (квартира, дата, {счётчик: значение}), отсортированные по
+    дате внутри квартиры; все квартиры обрабатываются за один проход.
+    """
+    anomalies = []
+    histories: dict[tuple[Optional[int], str], list[Point]] = {}
+    for apartment, created, values in rows:
+        for kind, value in values.items():
+            if value is None:
+                continue
+            history = histories.setdefault((apartment, kind), [])
+            if created >= since and history:
+                reason, typical = check_value(history, created, value)
+                if reason:
+                    anomalies.append(
+                        Anomaly(
+                            apartment,
+                            kind,
+                            value,
+                            history[-1][1],
+                            typical,
+                            reason,
+                        )
+                    )
+            history.append((created, value))
+    return anomalies
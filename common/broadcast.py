@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+from typing import Any, Iterable, NamedTuple, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 30  # сообщений в секунду на бота (лимит Telegram)
+CHAT_INTERVAL = 1.0  # секунд между сообщениями в один чат
+WORKERS = 8  # сообщений, отправляемых одновременно
+MAX_RETRIES = 3  # попыток при сетевых ошибках и ошибках сервера
+RETRY_DELAY = 1.0  # секунд до повтора, растёт вдвое с каждой попыткой
+CHAT_TRACK_LIMIT = 1024  # чатов с отметкой времени до чистки устаревших
+
+
+class TokenBucket:
+    """Ограничитель частоты: не больше rate событий в секунду."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Останавливает выдачу на seconds (ответ retry_after)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OutgoingMessage(NamedTuple):
+    chat_id: int
+    text: str
+    reply_markup: Any = None
+
+
+class BroadcastResult:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.sent: list[int] = []
+        self.forbidden: list[int] = []
+        self.failed: list[int] = []
+
+    @property
+    def done(self) -> int:
+        return len(self.sent) + len(self.forbidden) + len(self.failed)
+
+
+class Broadcaster:
+    """Рассылка сообщений пулом воркеров с учётом лимитов Telegram.
+
+    Общий TokenBucket ограничивает частоту для всего бота, отдельный
+    интервал - частоту в один чат. На TelegramRetryAfter вся рассылка
+    ставится на паузу и сообщение отправляется повторно; такие повторы
+    не расходуют MAX_RETRIES.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float = GLOBAL_RATE,
+        chat_interval: float = CHAT_INTERVAL,
+        workers: int = WORKERS,
+    ) -> None:
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.chat_interval = chat_interval
+        self.workers = workers
+        # чат -> время, раньше которого в него нельзя отправлять
+        self._chat_next: dict[int, float] = {}
+
+    async def _wait_chat(self, chat_id: int) -> None:
+        """Ждёт очереди чата.
+
+        Время занимается до ожидания, без await между чтением и записью,
+        поэтому одновременные отправки в один чат идут по очереди.
+        """
+        now = time.monotonic()
+        if len(self._chat_next) >= CHAT_TRACK_LIMIT:
+            self._chat_next = {
+                chat: moment
+                for chat, moment in self._chat_next.items()
+                if moment > now
+            }
+        start = max(now, self._chat_next.get(chat_id, now))
+        self._chat_next[chat_id] = start + self.chat_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def send_one(self, message: OutgoingMessage) -> str:
+        """Отправляет сообщение, возвращает sent, forbidden или failed."""
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            await self._wait_chat(message.chat_id)
+            try:
+                await self.bot.send_message(
+                    message.chat_id,
+                    text=message.text,
+                    reply_markup=message.reply_markup,
+                )
+                return "sent"
+            except TelegramRetryAfter as e:
+                logger.warning(f"Лимит Telegram, пауза {e.retry_after} с")
+                self.bucket.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                if attempt >= MAX_RETRIES:
+                    logger.error(
+                        f"Не удалось отправить {message.chat_id} "
+                        f"за {MAX_RETRIES} попытки: {e}"
+                    )
+                    return "failed"
+                await asyncio.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+            except TelegramForbiddenError:
+                return "forbidden"
+            except TelegramBadRequest as e:
+                logger.error(
+                    f"Неверный запрос при отправке {message.chat_id}: {e}"
+                )
+                return "failed"
+            except Exception as e:
+                logger.error(
+                    f"Неизвестная ошибка при отправке {message.chat_id}: {e}"
+                )
+                return "failed"
+
+    async def send(self, messages: Iterable[OutgoingMessage]) -> list[str]:
+        """Отправляет сообщения не более чем workers сразу.
+
+        Возвращает статусы send_one в порядке сообщений.
+        """
+        messages = list(messages)
+        statuses: list[str] = [""] * len(messages)
+        pending = iter(enumerate(messages))
+
+        async def worker() -> None:
+            for i, message in pending:
+                statuses[i] = await self.send_one(message)
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.workers, len(messages))))
+        )
+        return statuses
+
+
+class BroadcastStatus:
+    """Показывает ход рассылки в одном редактируемом сообщении.
+
+    Сообщение задаётся chat_id и message_id: его обновляет процесс,
+    который отправляет рассылку, а не обязательно тот, что её начал.
+    """
+
+    def __init__(
+        self, bot: Bot, chat_id: int, message_id: int, title: str
+    ) -> None:
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self._last_text: Optional[str] = None
+
+    async def __call__(self, result: BroadcastResult) -> None:
+        text = (
+            f"{self.title}\n"
+            f"Обработано {result.done} из {result.total}\n"
+            f"✅ Доставлено: {len(result.sent)}\n"
+            f"🚫 Заблокировали бота: {len(result.forbidden)}\n"
+            f"⚠️ Ошибок: {len(result.failed)}"
+        )
+        if result.done == result.total:
+            text += "\n\nРассылка завершена."
+        if text == self._last_text:
+            return
+        try:
+            await self.bot.edit_message_text(
+                text, chat_id=self.chat_id, message_id=self.message_id
+            )
+            self._last_text = text
+        except TelegramBadRequest as e:
+            logger.warning(f"Не удалось обновить статус рассылки: {e}")
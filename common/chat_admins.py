@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+
+from aiogram import Bot
+from aiogram.types import ChatMember
+
+ADMIN_STATUSES = ("creator", "administrator")
+
+
+class ChatAdminCache:
+    """Кэш администраторов групповых чатов.
+
+    Список админов чата запрашивается у Telegram не чаще раза в ttl
+    секунд, между запросами он обновляется по событиям chat_member.
+    Права в боте проверяются по roster - админам из БД (User.admin):
+    он загружается при запуске и заменяется после записи в БД. Права
+    дают только группы из groups (GROUP_CHAT_IDS).
+    """
+
+    def __init__(self, ttl: float = 600) -> None:
+        self.ttl = ttl
+        self.roster: frozenset[int] = frozenset()
+        self.groups: frozenset[int] = frozenset()
+        self._chats: dict[int, dict[int, ChatMember]] = {}
+        self._expires: dict[int, float] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    def _is_fresh(self, chat_id: int) -> bool:
+        return self._expires.get(chat_id, 0) > time.monotonic()
+
+    async def get(
+        self, bot: Bot, chat_id: int, refresh: bool = False
+    ) -> dict[int, ChatMember]:
+        """Админы чата по tele_id, при необходимости запрашивает Telegram."""
+        if not refresh and self._is_fresh(chat_id):
+            return self._chats[chat_id]
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            if refresh or not self._is_fresh(chat_id):
+                admins = await bot.get_chat_administrators(chat_id)
+                self.set_chat(chat_id, admins)
+        return self._chats[chat_id]
+
+    async def get_creator(self, bot: Bot, chat_id: int) -> Optional[ChatMember]:
+        admins = await self.get(bot, chat_id)
+        for admin in admins.values():
+            if admin.status == "creator":
+                return admin
+        return None
+
+    def set_chat(self, chat_id: int, admins: Iterable[ChatMember]) -> None:
+        self._chats[chat_id] = {
+            admin.user.id: admin
+            for admin in admins
+            if admin.status in ADMIN_STATUSES and not admin.user.is_bot
+        }
+        self._expires[chat_id] = time.monotonic() + self.ttl
+
+    def update_member(self, chat_id: int, member: ChatMember) -> bool:
+        """Применяет изменение статуса участника из события chat_member.
+
+        Возвращает True, если изменился список админов чата.
+        """
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return False
+        if member.status in ADMIN_STATUSES and not member.user.is_bot:
+            changed = member.user.id not in chat
+            chat[member.user.id] = member
+            return changed
+        return chat.pop(member.user.id, None) is not None
+
+    def set_groups(self, chat_ids: Iterable[int]) -> None:
+        self.groups = frozenset(chat_ids)
+
+    def is_group(self, chat_id: int) -> bool:
+        """Дают ли админы чата права в боте."""
+        return chat_id in self.groups
+
+    def chat_admin_names(self, chat_id: int) -> dict[int, str]:
+        """Админы одного чата: tele_id -> имя."""
+        return {
+            tele_id: admin.user.full_name
+            for tele_id, admin in self._chats.get(chat_id, {}).items()
+        }
+
+    def admin_names(self) -> Optional[dict[int, str]]:
+        """Полный список админов групп groups: tele_id -> имя.
+
+        None, пока админы какой-то группы не получены: по неполному
+        списку нельзя снимать права.
+        """
+        if not self.groups or not self.groups <= self._chats.keys():
+            return None
+        return {
+            tele_id: name
+            for chat_id in self.groups
+            for tele_id, name in self.chat_admin_names(chat_id).items()
+        }
+
+    def set_roster(self, tele_ids: Iterable[int]) -> None:
+        self.roster = frozenset(tele_ids)
+
+    def is_admin(self, tele_id: int) -> bool:
+        return tele_id in self.roster
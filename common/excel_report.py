@@ -0,0 +1,275 @@
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+
+REPORT_WORKERS = 2  # отчётов, собираемых одновременно
+QUEUE_SIZE = 8  # пачек строк в очереди к потоку записи
+MAX_WIDTH = 50
+YIELD_ROWS = 50  # строк между уступками GIL циклу событий
+PUT_TIMEOUT = 1.0  # секунд ожидания места в очереди между проверками потока
+
+_executor = ThreadPoolExecutor(
+    max_workers=REPORT_WORKERS, thread_name_prefix="excel"
+)
+
+Row = Sequence[Any]
+
+
+class ReportSheet(NamedTuple):
+    title: str
+    header: list[str]
+    chunks: AsyncIterable[Sequence[Row]]  # строки пачками из БД
+    convert: Optional[Callable[[Row], Row]] = None  # вызывается в потоке
+    widths: Optional[list[int]] = None  # по умолчанию - по заголовкам
+    # подпись листа по строке: при её смене начинается новый лист
+    split: Optional[Callable[[Row], str]] = None
+
+
+class _SheetStart(NamedTuple):
+    title: str
+    header: list[str]
+    convert: Optional[Callable[[Row], Row]]
+    widths: Optional[list[int]]
+    split: Optional[Callable[[Row], str]]
+
+
+_DONE = object()
+_ABORT = object()
+
+
+def _add_sheet(workbook: Workbook, spec: _SheetStart, title: str):
+    sheet = workbook.create_sheet(title[:31])  # предел длины имени листа
+    widths = spec.widths or [
+        min(len(column) + 3, MAX_WIDTH) for column in spec.header
+    ]
+    for i, width in enumerate(widths, start=1):
+        sheet.column_dimensions[get_column_letter(i)].width = width
+    header = []
+    for column in spec.header:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        header.append(cell)
+    sheet.append(header)
+    return sheet
+
+
+def _discard(workbook: Workbook) -> None:
+    """Закрывает листы несохранённой книги и удаляет их временные файлы.
+
+    Иначе генераторы openpyxl дописывают листы при сборке мусора уже
+    в закрытый файл.
+    """
+    for sheet in workbook.worksheets:
+        writer = sheet._writer
+        if writer is None:
+            continue
+        try:
+            sheet.close()
+        finally:
+            writer.cleanup()
+
+
+def _write(items: queue.Queue) -> Optional[bytes]:
+    """Собирает книгу в режиме write-only из очереди (в отдельном потоке)."""
+    workbook = Workbook(write_only=True)
+    try:
+        return _fill(workbook, items)
+    except BaseException:
+        _discard(workbook)
+        raise
+
+
+def _fill(workbook: Workbook, items: queue.Queue) -> Optional[bytes]:
+    spec = sheet = part = None
+    while True:
+        item = items.get()
+        if item is _ABORT:
+            _discard(workbook)
+            return None
+        if item is _DONE or isinstance(item, _SheetStart):
+            if spec is not None and sheet is None:
+                _add_sheet(workbook, spec, spec.title)  # лист без строк
+            if item is _DONE:
+                break
+            spec, sheet, part = item, None, None
+            continue
+        for i, row in enumerate(item, start=1):
+            if spec.split:
+                row_part = spec.split(row)
+                if sheet is None or row_part != part:
+                    part = row_part
+                    sheet = _add_sheet(workbook, spec, f"{spec.title} {part}")
+            elif sheet is None:
+                sheet = _add_sheet(workbook, spec, spec.title)
+            sheet.append(spec.convert(row) if spec.convert else list(row))
+            if i % YIELD_ROWS == 0:
+                time.sleep(0)  # не держим GIL весь интервал переключения
+    virtual_workbook = BytesIO()
+    workbook.save(virtual_workbook)
+    return virtual_workbook.getvalue()
+
+
+def _abort(items: queue.Queue) -> None:
+    """Останавливает поток записи, не блокируясь на полной очереди."""
+    while True:
+        try:
+            items.put_nowait(_ABORT)
+            return
+        except queue.Full:
+            try:
+                items.get_nowait()  # строки уже не нужны
+            except queue.Empty:
+                pass
+
+
+async def build_report(sheets: Iterable[ReportSheet]) -> BytesIO:
+    """Создаёт Excel-файл, не блокируя цикл событий.
+
+    Строки читаются из БД пачками и передаются через ограниченную
+    очередь в поток, который пишет их в книгу openpyxl в режиме
+    write-only: в памяти не держится ни вся выборка, ни все ячейки.
+    """
+    loop = asyncio.get_running_loop()
+    items: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    writer = loop.run_in_executor(_executor, _write, items)
+
+    async def put(item) -> None:
+        while True:
+            if writer.done():
+                await writer  # исключение потока записи
+                raise RuntimeError("Поток записи отчёта завершился досрочно")
+            try:
+                items.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            try:
+                await asyncio.to_thread(items.put, item, timeout=PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue  # проверим, жив ли поток записи
+
+    try:
+        for sheet in sheets:
+            await put(
+                _SheetStart(
+                    sheet.title,
+                    sheet.header,
+                    sheet.convert,
+                    sheet.widths,
+                    sheet.split,
+                )
+            )
+            async for chunk in sheet.chunks:
+                await put(list(chunk))
+    except BaseException:
+        _abort(items)
+        raise
+    await put(_DONE)
+    return BytesIO(await writer)
+
+
+def _format_created(created) -> str:
+    return created.strftime("%Y-%m-%d %H:%M") if created else ""
+
+
+def created_month(row: Row) -> str:
+    """Месяц списания (последний столбец) - для листа на каждый месяц."""
+    return row[-1].strftime("%m.%Y")
+
+
+def format_reading(row: Row) -> list:
+    """Строка показаний: пустые значения - 0, последний столбец - дата."""
+    *values, created = row
+    return [
+        *(0 if value is None else value for value in values),
+        _format_created(created),
+    ]
+
+
+def format_consumption(row: Row) -> list:
+    """Строка расхода: без предыдущего списания расход остаётся пустым."""
+    *values, created = row
+    return [*values, _format_created(created)]
+
+
+if __name__ == "__main__":
+    # Задержка цикла событий при сборке отчёта за 10 лет по всем квартирам:
+    # python -m common.excel_report
+    from datetime import datetime
+
+    from handlers.const import APARTMENTCOUNT
+
+    YEARS = 10
+    CHUNK = 500
+    rows = [
+        (apartment, 1, 2, 3, 4, datetime(2015 + month // 12, month % 12 + 1, 1))
+        for apartment in range(1, APARTMENTCOUNT + 1)
+        for month in range(YEARS * 12)
+    ]
+
+    async def chunks():
+        for start in range(0, len(rows), CHUNK):
+            end = start + CHUNK
+            await asyncio.sleep(0)  # как выборка из БД
+            yield rows[start:end]
+
+    async def measure(build) -> tuple[float, float, float]:
+        lags = []
+        stop = asyncio.Event()
+
+        async def ticker() -> None:
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lags.append(time.perf_counter() - started - 0.001)
+
+        task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await build()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await task
+        lags.sort()
+        return elapsed, lags[int(len(lags) * 0.99)], lags[-1]
+
+    async def in_loop() -> None:
+        workbook = Workbook()
+        sheet = workbook.active
+        async for chunk in chunks():
+            for row in chunk:
+                sheet.append(format_reading(row))
+        workbook.save(BytesIO())
+
+    async def streaming() -> None:
+        header = ["Квартира", "1", "2", "3", "4", "Дата списания"]
+        await build_report(
+            [ReportSheet("Вода", header, chunks(), format_reading)]
+        )
+
+    async def main() -> None:
+        print(f"Строк: {len(rows)}")
+        for name, build in (("В цикле", in_loop), ("Поток", streaming)):
+            elapsed, p99, lag = await measure(build)
+            print(
+                f"{name}: {elapsed:.2f} с, задержка цикла "
+                f"p99 {p99 * 1000:.1f} мс, макс. {lag * 1000:.1f} мс"
+            )
+
+    asyncio.run(main())
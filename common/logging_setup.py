@@ -0,0 +1,73 @@
+import gzip
+import logging
+import os
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s, %(levelname)s, %(message)s /%(funcName)s/"
+
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, сжимающий старые файлы в .gz."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.namer = self._gzip_name
+        self.rotator = self._gzip_rotate
+
+    @staticmethod
+    def _gzip_name(name: str) -> str:
+        return name + ".gz"
+
+    @staticmethod
+    def _gzip_rotate(source: str, dest: str) -> None:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+def parse_levels(text: str) -> dict[str, str]:
+    """Разбирает "aiogram=WARNING,dbase=DEBUG" в словарь модуль -> уровень."""
+    levels = {}
+    for item in text.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(
+    filename: str,
+    level: str = "ERROR",
+    levels: Optional[dict[str, str]] = None,
+    max_bytes: int = 50_000_000,
+    backup_count: int = 5,
+) -> QueueListener:
+    """Пишет лог в файл из отдельного потока.
+
+    Обработчики в цикле событий только кладут записи в очередь; запись
+    на диск, ротацию и сжатие выполняет QueueListener. Возвращает
+    запущенный listener - его нужно остановить при выходе, чтобы
+    дописать очередь.
+    """
+    file_handler = GzipRotatingFileHandler(
+        filename,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+    listener.start()
+    return listener
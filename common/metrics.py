@@ -0,0 +1,193 @@
+import time
+from bisect import bisect_left
+from typing import Sequence
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# секунды: от быстрых запросов к БД до медленных запросов к Telegram
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(names: Sequence[str], values: Sequence, **extra) -> str:
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in (*zip(names, values), *extra.items())
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: счётчики по верхним границам."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики корзин (последняя - +Inf), сумма]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket = _labels(self.labels, labels, le=bound)
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            suffix = _labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+handler_seconds = Histogram(
+    "bot_handler_seconds",
+    "Время обработчика aiogram",
+    ("router", "handler"),
+)
+handler_errors = Counter(
+    "bot_handler_errors_total",
+    "Исключения в обработчиках aiogram",
+    ("router", "handler", "error"),
+)
+db_query_seconds = Histogram(
+    "bot_db_query_seconds",
+    "Время SQL-запроса",
+    ("statement",),
+)
+db_errors = Counter(
+    "bot_db_errors_total",
+    "Ошибки SQL-запросов",
+    ("statement",),
+)
+telegram_seconds = Histogram(
+    "bot_telegram_request_seconds",
+    "Время запроса к Bot API",
+    ("method",),
+)
+telegram_errors = Counter(
+    "bot_telegram_errors_total",
+    "Ошибки запросов к Bot API",
+    ("method", "error"),
+)
+
+METRICS = (
+    handler_seconds,
+    handler_errors,
+    db_query_seconds,
+    db_errors,
+    telegram_seconds,
+    telegram_errors,
+)
+
+
+def render() -> str:
+    return (
+        "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+    )
+
+
+def _statement_kind(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement else ""
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Засекает каждый SQL-запрос движка через события SQLAlchemy."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        db_query_seconds.observe(
+            time.perf_counter() - start, _statement_kind(statement)
+        )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()  # after_cursor_execute не будет
+        db_errors.inc(_statement_kind(context.statement))
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        text=render(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def serve_metrics(host: str, port: int) -> web.AppRunner:
+    """Запускает HTTP-сервер с /metrics; остановка - runner.cleanup()."""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
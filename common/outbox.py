@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, NamedTuple, Optional
+
+from aiogram.types import InlineKeyboardMarkup, Message
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from common.broadcast import (
+    Broadcaster,
+    BroadcastResult,
+    BroadcastStatus,
+    OutgoingMessage,
+)
+from dbase.models import OutboxBatch
+from dbase.orm_query import (
+    orm_add_outbox,
+    orm_claim_outbox,
+    orm_finish_outbox_batch,
+    orm_get_outbox_batch,
+    orm_get_outbox_batch_info,
+    orm_reset_outbox_sending,
+    orm_set_outbox_status,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+POLL_INTERVAL = 5.0  # секунд между проверками очереди без пробуждения
+
+DoneCallback = Callable[
+    [AsyncSession, OutboxBatch, BroadcastResult], Awaitable[None]
+]
+
+
+class OutboxMessage(NamedTuple):
+    key: str  # ключ идемпотентности: сообщение с тем же ключом не повторяется
+    chat_id: int
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+class OutboxDispatcher:
+    """Отправляет сообщения из таблицы outbox пачками.
+
+    Сообщения сначала записываются в БД, затем фоновая задача забирает
+    их пачками и отправляет через Broadcaster. Прерванная перезапуском
+    рассылка продолжается с места остановки. Ход рассылки и действие
+    по её завершении (on_done) описаны записью OutboxBatch, поэтому
+    их выполняет процесс, отправляющий сообщения.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        broadcaster: Broadcaster,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+        on_done: Optional[DoneCallback] = None,
+    ) -> None:
+        self.session_maker = session_maker
+        self.broadcaster = broadcaster
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.on_done = on_done
+        self._wakeup = asyncio.Event()
+        self._statuses: dict[str, BroadcastStatus] = {}
+
+    async def enqueue(
+        self,
+        session: AsyncSession,
+        messages: Iterable[OutboxMessage],
+        batch: Optional[str] = None,
+        title: str = "",
+        status: Optional[Message] = None,
+        admin_tele_id: Optional[int] = None,
+    ) -> int:
+        """Записывает сообщения в outbox, возвращает число новых.
+
+        status - сообщение, в котором показывается ход рассылки batch;
+        admin_tele_id - кому отправить сводку о заблокировавших бота.
+        """
+        rows = [
+            {
+                "key": message.key,
+                "chat_id": message.chat_id,
+                "text": message.text,
+                "reply_markup": (
+                    message.reply_markup.model_dump_json(exclude_none=True)
+                    if message.reply_markup
+                    else None
+                ),
+            }
+            for message in messages
+        ]
+        batch_info = {
+            "title": title,
+            "status_chat_id": status.chat.id if status else None,
+            "status_message_id": status.message_id if status else None,
+            "admin_tele_id": admin_tele_id,
+        }
+        added = (
+            await orm_add_outbox(session, rows, batch, batch_info)
+            if rows
+            else 0
+        )
+        self._wakeup.set()
+        return added
+
+    async def run(self) -> None:
+        async with self.session_maker() as session:
+            lost = await orm_reset_outbox_sending(session)
+        if lost:
+            logger.warning(
+                f"{lost} сообщений прерваны перезапуском и не переотправлены"
+            )
+        while True:
+            try:
+                if await self._drain_batch():
+                    continue
+            except Exception as e:
+                logger.error(f"Ошибка отправки из outbox: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _drain_batch(self) -> bool:
+        async with self.session_maker() as session:
+            rows = await orm_claim_outbox(session, self.batch_size)
+            if not rows:
+                return False
+            statuses = await self.broadcaster.send(
+                OutgoingMessage(
+                    row.chat_id,
+                    row.text,
+                    (
+                        InlineKeyboardMarkup.model_validate_json(
+                            row.reply_markup
+                        )
+                        if row.reply_markup
+                        else None
+                    ),
+                )
+                for row in rows
+            )
+            ids_by_status: dict[str, list[int]] = {}
+            for row, status in zip(rows, statuses):
+                ids_by_status.setdefault(status, []).append(row.id)
+            for status, ids in ids_by_status.items():
+                await orm_set_outbox_status(session, ids, status)
+            for batch in {row.batch for row in rows if row.batch}:
+                await self._report(session, batch)
+        return True
+
+    async def _report(self, session: AsyncSession, batch: str) -> None:
+        info = await orm_get_outbox_batch_info(session, batch)
+        if info is None or info.finished:
+            return
+        rows = await orm_get_outbox_batch(session, batch)
+        result = BroadcastResult(len(rows))
+        pending = False
+        for chat_id, status in rows:
+            if status in ("pending", "sending"):
+                pending = True
+            elif status in ("sent", "forbidden"):
+                getattr(result, status).append(chat_id)
+            else:
+                result.failed.append(chat_id)
+        if info.status_message_id:
+            status = self._statuses.get(batch)
+            if status is None:
+                status = self._statuses[batch] = BroadcastStatus(
+                    self.broadcaster.bot,
+                    info.status_chat_id,
+                    info.status_message_id,
+                    info.title,
+                )
+            await status(result)
+        if pending:
+            return
+        self._statuses.pop(batch, None)
+        if await orm_finish_outbox_batch(session, batch) and self.on_done:
+            await self.on_done(session, info, result)
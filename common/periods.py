@@ -0,0 +1,82 @@
+import re
+from datetime import datetime
+from typing import Optional
+
+Period = tuple[datetime, datetime]  # [начало, конец)
+
+_MONTH = r"(\d{1,2})\.(\d{4})"
+_PERIOD = re.compile(rf"^\s*{_MONTH}\s*(?:-\s*{_MONTH}\s*)?$")
+
+
+def _next_month(moment: datetime) -> datetime:
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+
+def period_of(moment: Optional[datetime] = None) -> int:
+    """Ключ месяца ГГГГММ для столбца period (по умолчанию - текущий)."""
+    moment = moment or datetime.now()
+    return moment.year * 100 + moment.month
+
+
+def months_period(year: int, month: int, months: int = 1) -> Period:
+    """Период из months месяцев, начиная с month.year."""
+    start = datetime(year, month, 1)
+    end = start
+    for _ in range(months):
+        end = _next_month(end)
+    return start, end
+
+
+def month_bounds(
+    year: Optional[int] = None, month: Optional[int] = None
+) -> Period:
+    """Границы месяца [начало, начало следующего), по умолчанию - текущего."""
+    now = datetime.now()
+    return months_period(year or now.year, month or now.month)
+
+
+def current_period(kind: str, now: Optional[datetime] = None) -> Period:
+    """Текущий месяц, прошлый месяц, квартал или год.
+
+    kind: month, prev, quarter, year.
+    """
+    now = now or datetime.now()
+    if kind == "prev":
+        year, month = divmod(now.year * 12 + now.month - 2, 12)
+        return months_period(year, month + 1)
+    if kind == "quarter":
+        return months_period(now.year, (now.month - 1) // 3 * 3 + 1, 3)
+    if kind == "year":
+        return months_period(now.year, 1, 12)
+    return months_period(now.year, now.month)
+
+
+def parse_period(text: str) -> Optional[Period]:
+    """Разбирает "ММ.ГГГГ" или "ММ.ГГГГ-ММ.ГГГГ" (оба месяца включительно)."""
+    match = _PERIOD.match(text or "")
+    if not match:
+        return None
+    month, year, last_month, last_year = match.groups()
+    if last_month is None:
+        last_month, last_year = month, year
+    months = [int(month), int(last_month)]
+    if not all(1 <= value <= 12 for value in months):
+        return None
+    start = datetime(int(year), months[0], 1)
+    end = _next_month(datetime(int(last_year), months[1], 1))
+    if start >= end:
+        return None
+    return start, end
+
+
+def period_months(start: datetime, end: datetime) -> int:
+    """Число месяцев, которые задевает период."""
+    last = datetime.fromordinal(end.toordinal() - 1)
+    return (last.year - start.year) * 12 + last.month - start.month + 1
+
+
+def format_period(start: datetime, end: datetime) -> str:
+    """Подпись периода: "01.2026" или "01.2026-03.2026"."""
+    first = start.strftime("%m.%Y")
+    last = datetime.fromordinal(end.toordinal() - 1).strftime("%m.%Y")
+    return first if first == last else f"{first}-{last}"
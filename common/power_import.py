@@ -0,0 +1,110 @@
+import csv
+import re
+from io import BytesIO, StringIO
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+from openpyxl import load_workbook
+
+from handlers.const import APARTMENTCOUNT
+
+_SEPARATORS = re.compile(r"[\s;,]+")
+
+Tariffs = tuple[int, int, int]
+
+
+class ImportResult:
+    def __init__(self) -> None:
+        self.accepted: dict[int, Tariffs] = {}  # квартира -> (T0, T1, T2)
+        self.rejected: list[tuple[int, str]] = []  # (номер строки, причина)
+
+
+class PowerRow(NamedTuple):
+    line: int
+    values: Sequence
+
+
+def _to_int(value) -> Optional[int]:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, int):
+        return value
+    text = str(value).strip() if value is not None else ""
+    return int(text) if text.isdigit() else None
+
+
+def rows_from_xlsx(data: bytes) -> list[PowerRow]:
+    """Строки первого листа книги Excel."""
+    workbook = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        return [
+            PowerRow(line, values)
+            for line, values in enumerate(
+                sheet.iter_rows(values_only=True), start=1
+            )
+            if any(value is not None for value in values)
+        ]
+    finally:
+        workbook.close()
+
+
+def rows_from_csv(text: str) -> list[PowerRow]:
+    try:
+        dialect = csv.Sniffer().sniff(text[:2048], delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    return [
+        PowerRow(line, values)
+        for line, values in enumerate(csv.reader(StringIO(text), dialect), 1)
+        if any(value.strip() for value in values)
+    ]
+
+
+def rows_from_text(text: str) -> list[PowerRow]:
+    """Вставленный текст: "квартира T0 T1 T2" в каждой строке."""
+    return [
+        PowerRow(line, _SEPARATORS.split(row.strip()))
+        for line, row in enumerate(text.splitlines(), start=1)
+        if row.strip()
+    ]
+
+
+def validate_power_rows(
+    rows: Iterable[PowerRow], last: dict[int, Tariffs]
+) -> ImportResult:
+    """Проверяет строки за один проход.
+
+    last - последние показания квартир до текущего месяца: новые
+    показания не могут быть меньше них. Строка заголовка пропускается.
+    """
+    result = ImportResult()
+    for line, values in rows:
+        numbers = [_to_int(value) for value in values[:4]]
+        if len(numbers) < 4 or None in numbers:
+            if line == 1 and _to_int(values[0]) is None:
+                continue  # заголовок
+            result.rejected.append(
+                (line, "нужны 4 числа: квартира, Т0, Т1, Т2")
+            )
+            continue
+        apartment, *tariffs = numbers
+        if not 0 < apartment <= APARTMENTCOUNT:
+            result.rejected.append((line, f"нет квартиры {apartment}"))
+            continue
+        if apartment in result.accepted:
+            result.rejected.append((line, f"кв {apartment} уже есть выше"))
+            continue
+        previous = last.get(apartment)
+        if previous and any(
+            old is not None and new < old for new, old in zip(tariffs, previous)
+        ):
+            result.rejected.append(
+                (
+                    line,
+                    f"кв {apartment}: меньше предыдущих "
+                    f"{'/'.join(str(old) for old in previous)}",
+                )
+            )
+            continue
+        result.accepted[apartment] = tuple(tariffs)
+    return result
@@ -0,0 +1,61 @@
+import asyncio
+from collections import defaultdict
+from functools import partial
+from typing import Awaitable, Callable, Hashable, Iterable
+
+Version = tuple[int, ...]
+
+MAX_REPORTS = 32  # отчётов в кэше, старые вытесняются
+
+
+class ReportCache:
+    """Кэш готовых отчётов с версиями данных.
+
+    Отчёт хранится по ключу (тип, период) вместе с версиями источников
+    данных, из которых он собран. Запись показаний увеличивает версию
+    источника, и следующий запрос собирает отчёт заново. Одинаковые
+    запросы, пришедшие во время сборки, ждут одну общую сборку.
+    """
+
+    def __init__(self, max_reports: int = MAX_REPORTS) -> None:
+        self.max_reports = max_reports
+        self.versions: defaultdict[str, int] = defaultdict(int)
+        self._reports: dict[Hashable, tuple[Version, bytes]] = {}
+        self._building: dict[tuple[Hashable, Version], asyncio.Task] = {}
+
+    def bump(self, *sources: str) -> None:
+        """Отмечает изменение данных источников."""
+        for source in sources:
+            self.versions[source] += 1
+
+    def version(self, sources: Iterable[str]) -> Version:
+        return tuple(self.versions[source] for source in sources)
+
+    async def get(
+        self,
+        key: Hashable,
+        sources: Iterable[str],
+        build: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        version = self.version(sources)
+        cached = self._reports.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        task = self._building.get((key, version))
+        if task is None:
+            task = asyncio.create_task(build())
+            self._building[key, version] = task
+            task.add_done_callback(partial(self._built, key, version))
+        # отмена одного ожидающего не прерывает сборку для остальных
+        return await asyncio.shield(task)
+
+    def _built(self, key: Hashable, version: Version, task: asyncio.Task):
+        del self._building[key, version]
+        if task.cancelled() or task.exception() is not None:
+            return
+        cached = self._reports.get(key)
+        if cached is None or cached[0] < version:
+            self._reports.pop(key, None)
+            self._reports[key] = (version, task.result())
+            while len(self._reports) > self.max_reports:
+                del self._reports[next(iter(self._reports))]
@@ -0,0 +1,100 @@
+import asyncio
+import hmac
+import logging
+
+from aiogram import Bot, Dispatcher, types
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+QUEUE_SIZE = 1000  # обновлений, ожидающих обработки
+HANDLERS = 16  # обновлений, обрабатываемых одновременно
+DRAIN_TIMEOUT = 30.0  # секунд на обработку очереди при остановке
+
+
+class WebhookServer:
+    """Принимает обновления Telegram по HTTP и передаёт их диспетчеру.
+
+    HTTP-обработчик только проверяет секрет и кладёт обновление в
+    ограниченную очередь; обработку ведут отдельные задачи. Когда
+    очередь заполнена, Telegram получает 503 и повторит запрос позже.
+    После stop() сервер перестаёт принимать запросы и дорабатывает
+    очередь.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dispatcher: Dispatcher,
+        secret: str,
+        path: str = "/webhook",
+        queue_size: int = QUEUE_SIZE,
+        handlers: int = HANDLERS,
+        drain_timeout: float = DRAIN_TIMEOUT,
+    ) -> None:
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.secret = secret
+        self.path = path
+        self.handlers = handlers
+        self.drain_timeout = drain_timeout
+        self.queue: asyncio.Queue[types.Update] = asyncio.Queue(queue_size)
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Завершает serve(); можно вызывать из обработчика сигнала."""
+        self._stopping.set()
+
+    async def receive(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret):
+            return web.Response(status=401)
+        try:
+            update = types.Update.model_validate(
+                await request.json(), context={"bot": self.bot}
+            )
+        except ValueError as e:
+            logger.warning(f"Неверное обновление от webhook: {e}")
+            return web.Response(status=400)
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Очередь обновлений переполнена")
+            return web.Response(status=503)
+        return web.Response()
+
+    async def handle(self) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def serve(self, host: str, port: int) -> None:
+        app = web.Application()
+        app.router.add_post(self.path, self.receive)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        tasks = [
+            asyncio.create_task(self.handle()) for _ in range(self.handlers)
+        ]
+        logger.info(f"Webhook слушает {host}:{port}{self.path}")
+        try:
+            await self._stopping.wait()
+            logger.info("Webhook останавливается")
+        finally:
+            await runner.cleanup()  # новые обновления больше не принимаются
+            try:
+                await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Не обработано {self.queue.qsize()} обновлений "
+                    "при остановке"
+                )
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,191 @@
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+STEM = "*"  # "бляд*" - основа слова, "*бляд*" - в любом месте слова
+
+# Как слово словаря должно стоять в слове текста
+WHOLE, PREFIX, INFIX = 0, 1, 2
+
+
+def parse_entry(word: str) -> tuple[str, int]:
+    """Разбирает запись словаря: (слово без звёздочек, способ поиска)."""
+    word = word.strip().lower()
+    if word.startswith(STEM) and word.endswith(STEM) and len(word) > 2:
+        return word.strip(STEM), INFIX
+    if word.endswith(STEM):
+        return word.rstrip(STEM), PREFIX
+    return word, WHOLE
+
+
+def load_exceptions(path: str) -> list[str]:
+    """Исключения из файла, по одному в строке; # - комментарий.
+
+    Записи размечаются как в словаре: "сукн*" - все слова, начинающиеся
+    с "сукн", "*страху*" - слова, содержащие "страху".
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.split("#", 1)[0].strip() for line in f]
+    except FileNotFoundError:
+        return []
+    return [line for line in lines if line]
+
+
+class WordMatcher:
+    """Поиск запрещённых слов автоматом Ахо-Корасик.
+
+    Все вхождения находятся за один проход по тексту. По умолчанию
+    слово засчитывается, только если совпадает со словом текста
+    целиком. Основы, помеченные звёздочкой, ловят словоформы
+    ("бляд*") или склеенные слова ("*бляд*"). Слово текста, подходящее
+    под запись из exceptions (разметка та же), не засчитывается. Слова
+    и текст приводятся к одному виду функцией normalize.
+    """
+
+    def __init__(
+        self,
+        words: Iterable[str] = (),
+        normalize: Callable[[str], str] = str.lower,
+        exceptions: Iterable[str] = (),
+    ) -> None:
+        self.normalize = normalize
+        # способ поиска -> нормализованные исключения
+        self.exceptions: dict[int, set[str]] = {
+            WHOLE: set(),
+            PREFIX: set(),
+            INFIX: set(),
+        }
+        for entry in exceptions:
+            stem, mode = parse_entry(entry)
+            stem = self.normalize(stem).strip()
+            if stem:
+                self.exceptions[mode].add(stem)
+        self._prefix_exceptions = tuple(self.exceptions[PREFIX])
+        self.load(words)
+
+    def load(self, words: Iterable[str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        # узел -> {запись: (длина, способ поиска)}
+        self._own: list[dict[str, tuple[int, int]]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[tuple[str, tuple[int, int]], ...]] = [()]
+        self._words: dict[str, int] = {}
+        self._dirty = False
+        for word in words:
+            self.add(word)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __iter__(self):
+        return iter(self._words)
+
+    def add(self, word: str) -> None:
+        word = word.strip().lower()
+        stem, mode = parse_entry(word)
+        pattern = self.normalize(stem).strip()
+        if not pattern or word in self._words:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._own.append({})
+            node = next_node
+        self._own[node][word] = (len(pattern), mode)
+        self._words[word] = node
+        self._dirty = True
+
+    def discard(self, word: str) -> None:
+        word = word.strip().lower()
+        node = self._words.pop(word, None)
+        if node is None:
+            return
+        self._own[node].pop(word, None)
+        self._dirty = True
+
+    def replace(self, old_word: str, new_word: str) -> None:
+        self.discard(old_word)
+        self.add(new_word)
+
+    def _build(self) -> None:
+        """Пересчитывает суффиксные ссылки после изменения словаря."""
+        size = len(self._goto)
+        self._fail = [0] * size
+        self._out = [()] * size
+        queue = deque()
+        for node in self._goto[0].values():
+            self._out[node] = tuple(self._own[node].items())
+            queue.append(node)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._out[child] = (
+                    tuple(self._own[child].items()) + self._out[fail]
+                )
+                queue.append(child)
+        self._dirty = False
+
+    def find_all(self, text: str) -> list[tuple[int, str]]:
+        """Возвращает все вхождения (позиция в тексте после
+        нормализации, слово)."""
+        return list(self._scan(self.normalize(text), first_only=False))
+
+    def search(self, text: str) -> Optional[str]:
+        """Возвращает первое найденное слово или None."""
+        for _, word in self._scan(self.normalize(text), first_only=True):
+            return word
+        return None
+
+    def _scan(self, text: str, first_only: bool):
+        if self._dirty:
+            self._build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not out[node]:
+                continue
+            for word, (length, mode) in out[node]:
+                start = i - length + 1
+                starts_word = start == 0 or not text[start - 1].isalpha()
+                ends_word = i + 1 == len(text) or not text[i + 1].isalpha()
+                if mode == WHOLE and not (starts_word and ends_word):
+                    continue
+                if mode == PREFIX and not starts_word:
+                    continue
+                if self._is_exception(self._text_word(text, start, i)):
+                    continue
+                yield start, word
+                if first_only:
+                    return
+
+    def _is_exception(self, word: str) -> bool:
+        return (
+            word in self.exceptions[WHOLE]
+            or word.startswith(self._prefix_exceptions)
+            or any(stem in word for stem in self.exceptions[INFIX])
+        )
+
+    @staticmethod
+    def _text_word(text: str, start: int, last: int) -> str:
+        """Слово текста, в котором лежит совпадение text[start..last]."""
+        end = last + 1
+        while start and text[start - 1].isalpha():
+            start -= 1
+        while end < len(text) and text[end].isalpha():
+            end += 1
+        return text[start:end]
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+from datetime import datetime, timezone
+from typing import Iterable, NamedTuple, Optional
+
+
+def to_utc_naive(moment: datetime) -> datetime:
+    """Время в UTC без tzinfo - так unblock_time хранится в БД."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BanRecord(NamedTuple):
+    tele_id: int
+    chat_id: int
+    confirmed: bool
+    unblock_time: Optional[datetime]
+
+
+class BanIndex:
+    """Индекс блокировок в памяти процесса.
+
+    Зеркало таблицы banned_users: модерация проверяет отправителя
+    по множеству tele_id без обращения к БД. Сроки подтверждённых
+    блокировок лежат в куче по unblock_time; устаревшие элементы кучи
+    отбрасываются при чтении.
+    """
+
+    def __init__(self) -> None:
+        self.records: dict[int, BanRecord] = {}
+        self.banned_tele_ids: set[int] = set()
+        self.chat_bans: dict[int, set[int]] = {}
+        self._user_bans: dict[int, set[int]] = {}
+        self._expiry: list[tuple[datetime, int]] = []
+        self.expiry_changed = asyncio.Event()
+
+    def load(self, bans: Iterable) -> None:
+        self.records.clear()
+        self.banned_tele_ids.clear()
+        self.chat_bans.clear()
+        self._user_bans.clear()
+        self._expiry.clear()
+        for ban in bans:
+            self.add(
+                ban.id,
+                ban.user_tele_id,
+                ban.chat_id,
+                bool(ban.confirmed),
+                ban.unblock_time,
+            )
+
+    def add(
+        self,
+        ban_id: int,
+        tele_id: int,
+        chat_id: int,
+        confirmed: bool = False,
+        unblock_time: Optional[datetime] = None,
+    ) -> None:
+        self.discard(ban_id)
+        self.records[ban_id] = BanRecord(
+            tele_id, chat_id, confirmed, unblock_time
+        )
+        self._user_bans.setdefault(tele_id, set()).add(ban_id)
+        if confirmed:
+            self.banned_tele_ids.add(tele_id)
+            self.chat_bans.setdefault(chat_id, set()).add(ban_id)
+            if unblock_time is not None:
+                entry = (to_utc_naive(unblock_time), ban_id)
+                heapq.heappush(self._expiry, entry)
+                if self._expiry[0] == entry:
+                    self.expiry_changed.set()
+
+    def set_confirmed(
+        self,
+        ban_id: int,
+        confirmed: bool,
+        unblock_time: Optional[datetime] = None,
+    ) -> None:
+        record = self.records.get(ban_id)
+        if record is None:
+            return
+        self.add(
+            ban_id, record.tele_id, record.chat_id, confirmed, unblock_time
+        )
+
+    def discard(self, ban_id: int) -> None:
+        record = self.records.pop(ban_id, None)
+        if record is None:
+            return
+        user_bans = self._user_bans.get(record.tele_id, set())
+        user_bans.discard(ban_id)
+        if not user_bans:
+            self._user_bans.pop(record.tele_id, None)
+        chat_bans = self.chat_bans.get(record.chat_id, set())
+        chat_bans.discard(ban_id)
+        if not chat_bans:
+            self.chat_bans.pop(record.chat_id, None)
+        if not any(self.records[i].confirmed for i in user_bans):
+            self.banned_tele_ids.discard(record.tele_id)
+
+    def discard_user(self, tele_id: int) -> None:
+        for ban_id in list(self._user_bans.get(tele_id, ())):
+            self.discard(ban_id)
+
+    def _is_current(self, entry: tuple[datetime, int]) -> bool:
+        record = self.records.get(entry[1])
+        return (
+            record is not None
+            and record.confirmed
+            and record.unblock_time is not None
+            and to_utc_naive(record.unblock_time) == entry[0]
+        )
+
+    def next_expiry(self) -> Optional[datetime]:
+        """Ближайший срок снятия блокировки (UTC без tzinfo)."""
+        while self._expiry and not self._is_current(self._expiry[0]):
+            heapq.heappop(self._expiry)
+        return self._expiry[0][0] if self._expiry else None
+
+    def pop_due(self, now: datetime) -> list[int]:
+        """Снимает с кучи ban_id со сроком не позже now."""
+        due = []
+        while self._expiry and self._expiry[0][0] <= now:
+            entry = heapq.heappop(self._expiry)
+            if self._is_current(entry):
+                due.append(entry[1])
+        return due
+
+    def is_banned(self, tele_id: int) -> bool:
+        return tele_id in self.banned_tele_ids
+
+    def get_chat_banned(self, chat_id: int) -> set[int]:
+        """tele_id подтверждённых блокировок в чате."""
+        return {
+            self.records[ban_id].tele_id
+            for ban_id in self.chat_bans.get(chat_id, ())
+        }
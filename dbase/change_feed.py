@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import dbase.storage
+from dbase.models import ChangeLog
+from dbase.orm_query import (
+    orm_get_bans_in,
+    orm_get_changes,
+    orm_get_last_change_id,
+    orm_get_users_in,
+    orm_get_words_in,
+    orm_prune_changes,
+)
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0  # секунд между опросами журнала
+BATCH = 500  # записей журнала за один запрос
+GAP_TIMEOUT = 30.0  # секунд ожидания записи с пропущенным id
+KEEP_CHANGES = timedelta(days=1)  # сколько хранится журнал
+PRUNE_INTERVAL = 3600  # секунд между чистками журнала
+
+
+class ChangeFeed:
+    """Применяет изменения других процессов к индексам в памяти.
+
+    Процессы пишут изменения слов, блокировок и пользователей в таблицу
+    change_log; лента опрашивает её по первичному ключу после последней
+    прочитанной записи и перечитывает из БД только изменённые строки.
+    id, пропущенные из-за ещё не закрытых транзакций, перечитываются
+    GAP_TIMEOUT секунд.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.session_maker = session_maker
+        self.interval = interval
+        self.last_id = 0
+        self._gaps: dict[int, float] = {}  # id -> срок ожидания
+
+    async def start(self, session: AsyncSession) -> None:
+        """Запоминает конец журнала; вызывается до загрузки индексов."""
+        self.last_id = await orm_get_last_change_id(session)
+
+    async def poll(self) -> int:
+        """Читает и применяет новые записи, возвращает их число."""
+        now = time.monotonic()
+        self._gaps = {
+            change_id: deadline
+            for change_id, deadline in self._gaps.items()
+            if deadline > now
+        }
+        async with self.session_maker() as session:
+            changes = await orm_get_changes(
+                session, self.last_id, self._gaps, BATCH
+            )
+            for change in changes:
+                self._gaps.pop(change.id, None)
+                if change.id > self.last_id:
+                    first = max(self.last_id + 1, change.id - BATCH)
+                    for gap in range(first, change.id):
+                        self._gaps[gap] = now + GAP_TIMEOUT
+                    self.last_id = change.id
+            await self.apply(
+                session,
+                [
+                    change
+                    for change in changes
+                    if change.origin != dbase.storage.ORIGIN
+                ],
+            )
+        return len(changes)
+
+    async def apply(
+        self, session: AsyncSession, changes: Sequence[ChangeLog]
+    ) -> None:
+        keys: dict[str, set[str]] = {}
+        for change in changes:
+            keys.setdefault(change.kind, set()).add(change.key)
+
+        words = keys.get("word")
+        if words:
+            present = await orm_get_words_in(session, words)
+            for word in words:
+                if word in present:
+                    dbase.storage.restricted_words.add(word)
+                else:
+                    dbase.storage.restricted_words.discard(word)
+
+        if "ban" in keys:
+            ban_ids = {int(key) for key in keys["ban"]}
+            bans = {
+                ban.id: ban for ban in await orm_get_bans_in(session, ban_ids)
+            }
+            for ban_id in ban_ids:
+                ban = bans.get(ban_id)
+                if ban is None:
+                    dbase.storage.ban_index.discard(ban_id)
+                else:
+                    dbase.storage.ban_index.add(
+                        ban.id,
+                        ban.user_tele_id,
+                        ban.chat_id,
+                        bool(ban.confirmed),
+                        ban.unblock_time,
+                    )
+
+        if "user" in keys:
+            tele_ids = {int(key) for key in keys["user"]}
+            users = {
+                user.tele_id: user
+                for user in await orm_get_users_in(session, tele_ids)
+            }
+            roster = set(dbase.storage.chat_admins.roster)
+            for tele_id in tele_ids:
+                user = users.get(tele_id)
+                if user is None:
+                    dbase.storage.residents.remove(tele_id)
+                    roster.discard(tele_id)
+                    continue
+                dbase.storage.residents.put(user)
+                if user.admin:
+                    roster.add(tele_id)
+                else:
+                    roster.discard(tele_id)
+            dbase.storage.chat_admins.set_roster(roster)
+
+        if "report" in keys:
+            dbase.storage.reports.bump(*keys["report"])
+
+    async def run(self, prune: bool = False) -> None:
+        """Опрашивает журнал; prune - ещё и удалять старые записи."""
+        pruned = float("-inf")
+        while True:
+            try:
+                while await self.poll() == BATCH:
+                    pass
+                if prune and time.monotonic() - pruned > PRUNE_INTERVAL:
+                    async with self.session_maker() as session:
+                        await orm_prune_changes(
+                            session, datetime.now() - KEEP_CHANGES
+                        )
+                    pruned = time.monotonic()
+            except Exception as e:
+                logger.error(f"Ошибка чтения журнала изменений: {e}")
+            await asyncio.sleep(self.interval)
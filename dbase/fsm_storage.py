@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from dbase.orm_query import orm_get_fsm, orm_save_fsm
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0  # секунд между сбросами изменений в БД
+
+
+class SQLStorage(BaseStorage):
+    """FSM-хранилище aiogram в БД бота.
+
+    Состояние и данные хранятся одной строкой на ключ, данные - в
+    компактном JSON. Изменения копятся в памяти и раз в flush_interval
+    секунд записываются в БД одной транзакцией. Чтение идёт из памяти;
+    cache_ttl ограничивает возраст прочитанной из БД записи - при
+    нескольких процессах его стоит делать небольшим.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        flush_interval: float = FLUSH_INTERVAL,
+        cache_ttl: Optional[float] = None,
+    ) -> None:
+        self.session_maker = session_maker
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        # ключ -> (состояние, данные в JSON, время загрузки)
+        self._cache: dict[str, tuple[Optional[str], Optional[str], float]] = {}
+        self._dirty: set[str] = set()
+        self._flusher: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(
+            "" if part is None else str(part)
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.business_connection_id,
+                key.destiny,
+            )
+        )
+
+    async def _load(self, key: str) -> tuple[Optional[str], Optional[str]]:
+        entry = self._cache.get(key)
+        if entry is not None and (
+            key in self._dirty
+            or self.cache_ttl is None
+            or time.monotonic() - entry[2] < self.cache_ttl
+        ):
+            return entry[0], entry[1]
+        async with self.session_maker() as session:
+            record = await orm_get_fsm(session, key)
+        if key in self._dirty:  # изменено, пока шло чтение
+            entry = self._cache[key]
+            return entry[0], entry[1]
+        state, data = (record.state, record.data) if record else (None, None)
+        self._cache[key] = (state, data, time.monotonic())
+        return state, data
+
+    async def _store(
+        self, key: str, state: Optional[str], data: Optional[str]
+    ) -> None:
+        self._cache[key] = (state, data, time.monotonic())
+        self._dirty.add(key)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Запускает отложенный сброс, если он ещё не ждёт своей очереди.
+
+        Задача, которая сама сейчас пишет в БД, не считается: изменения,
+        пришедшие во время записи, в неё уже не попадут.
+        """
+        if (
+            self._flusher is None
+            or self._flusher.done()
+            or self._flusher is asyncio.current_task()
+        ):
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает накопленные изменения в БД."""
+        keys, self._dirty = self._dirty, set()
+        if not keys:
+            return
+        rows, deleted = [], []
+        for key in keys:
+            state, data, _ = self._cache[key]
+            if state is None and data is None:
+                deleted.append(key)
+            else:
+                rows.append({"key": key, "state": state, "data": data})
+        try:
+            async with self.session_maker() as session:
+                await orm_save_fsm(session, rows, deleted)
+        except asyncio.CancelledError:
+            self._dirty |= keys
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка записи FSM в БД: {e}")
+            self._dirty |= keys
+            self._schedule()
+            return
+        for key in deleted:
+            if key not in self._dirty:
+                self._cache.pop(key, None)
+        if self._dirty:  # изменено, пока шла запись
+            self._schedule()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        key = self._key(key)
+        _, data = await self._load(key)
+        state = state.state if isinstance(state, State) else state
+        await self._store(key, state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(self._key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        key = self._key(key)
+        state, _ = await self._load(key)
+        encoded = (
+            json.dumps(dict(data), ensure_ascii=False, separators=(",", ":"))
+            if data
+            else None
+        )
+        await self._store(key, state, encoded)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(self._key(key))
+        return json.loads(data) if data else {}
+
+    async def close(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher  # прерванная запись вернёт ключи
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
@@ -1,14 +1,26 @@
+from datetime import datetime
+
 from sqlalchemy import (
     BigInteger,
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
+    Text,
     func,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from common.periods import period_of
+
+
+def _default_period(context) -> int:
+    """Период записи по переданной дате created, иначе - текущий."""
+    created = context.get_current_parameters().get("created")
+    return period_of(created if isinstance(created, datetime) else None)
+
 
 class Base(DeclarativeBase):
     created: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
@@ -37,9 +49,15 @@ class User(Base):
 
 class Power(Base):
     __tablename__ = "power"
+    __table_args__ = (
+        Index("ix_power_apartment_created", "apartment", "created"),
+        Index("ux_power_apartment_period", "apartment", "period", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     apartment: Mapped[int] = mapped_column(Integer, nullable=False)
+    # месяц показаний ГГГГММ: одна запись на квартиру за месяц
+    period: Mapped[int] = mapped_column(Integer, default=_default_period)
     t0: Mapped[int] = mapped_column(Integer, nullable=True)
     t1: Mapped[int] = mapped_column(Integer, nullable=True)
     t2: Mapped[int] = mapped_column(Integer, nullable=True)
@@ -53,8 +71,14 @@ class Power(Base):
 
 class Meter(Base):
     __tablename__ = "meter"
+    __table_args__ = (
+        Index("ix_meter_user_id_created", "user_id", "created"),
+        Index("ux_meter_user_id_period", "user_id", "period", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # месяц показаний ГГГГММ: одна сводка на пользователя за месяц
+    period: Mapped[int] = mapped_column(Integer, default=_default_period)
     water_hot_bath: Mapped[int] = mapped_column(Integer, nullable=True)
     water_cold_bath: Mapped[int] = mapped_column(Integer, nullable=True)
     water_hot_kitchen: Mapped[int] = mapped_column(Integer, nullable=True)
@@ -75,6 +99,38 @@ class Meter(Base):
         )
 
 
+METER_KINDS = (
+    "water_hot_bath",
+    "water_cold_bath",
+    "water_hot_kitchen",
+    "water_cold_kitchen",
+)
+
+
+class MeterReading(Base):
+    """Журнал показаний: строка на каждое переданное значение счётчика.
+
+    Записи только добавляются; Meter - сводка текущего месяца по нему.
+    """
+
+    __tablename__ = "meter_reading"
+    __table_args__ = (
+        Index("ix_meter_reading_user_id_created", "user_id", "created"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    apartment: Mapped[int] = mapped_column(Integer, nullable=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    value: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<MeterReading(user_id={self.user_id}, kind={self.kind}, "
+            f"value={self.value}, created={self.created})>"
+        )
+
+
 class Words(Base):
     __tablename__ = "words"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -99,3 +155,65 @@ class BanUsers(Base):
         Boolean, nullable=True, default=False
     )
     user: Mapped["User"] = relationship(back_populates="ban_records")
+
+
+class Outbox(Base):
+    __tablename__ = "outbox"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
+    batch: Mapped[str] = mapped_column(String(96), nullable=True, index=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    reply_markup: Mapped[str] = mapped_column(Text, nullable=True)
+    # pending -> sending -> sent / forbidden / failed;
+    # sending, оставшиеся после перезапуска, -> unknown (не переотправляются)
+    status: Mapped[str] = mapped_column(
+        String(16), nullable=False, default="pending", index=True
+    )
+
+
+class OutboxBatch(Base):
+    """Рассылка из outbox: где показывать ход и что сделать в конце.
+
+    Хранится в БД, чтобы ход рассылки показывал процесс, который её
+    отправляет, а не только тот, что её начал.
+    """
+
+    __tablename__ = "outbox_batch"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    batch: Mapped[str] = mapped_column(String(96), nullable=False, unique=True)
+    title: Mapped[str] = mapped_column(String(128), nullable=False)
+    # сообщение со статусом рассылки
+    status_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    status_message_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    # админ, которому после рассылки уходит сводка о заблокировавших бота;
+    # заблокировавшие удаляются из жильцов
+    admin_tele_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    finished: Mapped[bool] = mapped_column(Boolean, default=False)
+
+
+class FsmRecord(Base):
+    """Состояние диалога aiogram: строка на ключ бот/чат/пользователь."""
+
+    __tablename__ = "fsm_state"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(String(255), unique=True)
+    state: Mapped[str] = mapped_column(String(128), nullable=True)
+    data: Mapped[str] = mapped_column(Text, nullable=True)  # JSON
+
+
+class ChangeLog(Base):
+    """Журнал изменений общих данных для других процессов бота.
+
+    kind - word, ban, user или report; key - слово, id блокировки,
+    tele_id или источник отчёта; origin - процесс, сделавший запись.
+    """
+
+    __tablename__ = "change_log"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    origin: Mapped[str] = mapped_column(String(32), nullable=False)
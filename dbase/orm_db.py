@@ -1,27 +1,100 @@
+import logging
 import os
 
+from sqlalchemy import delete, extract, func, inspect, select, text, update
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
-from dbase.models import Base
-from dbase.orm_query import create_restrict_words_db, orm_create_test_users
+from common.metrics import instrument_engine
+from dbase.models import Base, Meter, Power
+from dbase.orm_query import (
+    create_restrict_words_db,
+    orm_backfill_readings,
+    orm_create_test_users,
+)
+
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(os.getenv("DATABASE_URL"), echo=True)
+# SQL_ECHO=1 пишет SQL-запросы в общий лог (через очередь, а не в stdout)
+if os.getenv("SQL_ECHO", "").lower() in ("1", "true", "yes"):
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+engine = create_async_engine(os.getenv("DATABASE_URL"))
+instrument_engine(engine)
 session_maker = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+def create_indexes(conn):
+    """Создаёт индексы, добавленные в модели после создания таблиц."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def add_period_columns(conn):
+    """Добавляет столбец period в таблицы, созданные до его появления.
+
+    Период заполняется по дате created. Из повторных записей за месяц
+    остаётся последняя, иначе не создать уникальный индекс; остальные
+    перед удалением копируются в таблицу <имя>_period_backup.
+    """
+    inspector = inspect(conn)
+    for table, owner in (
+        (Meter.__table__, Meter.__table__.c.user_id),
+        (Power.__table__, Power.__table__.c.apartment),
+    ):
+        columns = {
+            column["name"] for column in inspector.get_columns(table.name)
+        }
+        if "period" in columns:
+            continue
+        conn.execute(
+            text(f"ALTER TABLE {table.name} ADD COLUMN period INTEGER")
+        )
+        conn.execute(
+            update(table).values(
+                period=extract("year", table.c.created) * 100
+                + extract("month", table.c.created),
+                updated=table.c.updated,  # не трогаем дату изменения
+            )
+        )
+        last = select(func.max(table.c.id)).group_by(owner, table.c.period)
+        duplicates = table.c.id.not_in(last)
+        count = conn.execute(
+            select(func.count()).select_from(table).where(duplicates)
+        ).scalar()
+        if not count:
+            continue
+        backup = f"{table.name}_period_backup"
+        conn.execute(
+            text(
+                f"CREATE TABLE {backup} AS SELECT * FROM {table.name} "
+                f"WHERE id NOT IN (SELECT max(id) FROM {table.name} "
+                f"GROUP BY {owner.name}, period)"
+            )
+        )
+        conn.execute(delete(table).where(duplicates))
+        logger.warning(
+            f"{table.name}: удалено {count} повторных записей за месяц, "
+            f"копии сохранены в {backup}"
+        )
+
+
 async def create_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_period_columns)
+        await conn.run_sync(create_indexes)
 
     async with session_maker() as session:
         await orm_create_test_users(session)
         await create_restrict_words_db(session)
+        await orm_backfill_readings(session)
 
 
 async def drop_db():
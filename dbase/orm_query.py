@@ -1,21 +1,79 @@
 import logging
 from datetime import datetime
-from typing import Optional, Sequence, Union
+from typing import AsyncIterator, Iterable, Optional, Sequence, Union
 
-from aiogram import Bot
 from aiogram.types import DateTime
-from sqlalchemy import delete, desc, extract, func, insert, select, update
+from sqlalchemy import delete, desc, extract, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
 
 
+import dbase.storage
+from common.periods import month_bounds, period_of
 from common.test_users import test_users
-from dbase.models import Meter, User, Words, BanUsers, Power
+from common.word_matcher import STEM
+from dbase.models import (
+    METER_KINDS,
+    BanUsers,
+    ChangeLog,
+    FsmRecord,
+    Meter,
+    MeterReading,
+    Outbox,
+    OutboxBatch,
+    Power,
+    User,
+    Words,
+)
 from handlers.const import NUMBER_TSJ
 
 logger = logging.getLogger(__name__)
 
+STREAM_CHUNK = 500  # строк за одну выборку серверного курсора
+
+
+def _upsert(
+    session: AsyncSession,
+    model,
+    rows: list[dict],
+    keys: tuple,
+    merge: bool = True,
+):
+    """INSERT ... ON CONFLICT DO UPDATE на диалекте БД сессии.
+
+    При конфликте по keys значения сливаются по полям: NULL в новой
+    строке оставляет старое значение, 0 записывается как значение.
+    merge=False - строка перезаписывается целиком. created остаётся
+    временем первой записи.
+    """
+    dialects = {"postgresql": postgresql, "sqlite": sqlite}
+    dialect = dialects[session.get_bind().dialect.name]
+    statement = dialect.insert(model).values(rows)
+    merged = {
+        name: (
+            func.coalesce(statement.excluded[name], getattr(model, name))
+            if merge
+            else statement.excluded[name]
+        )
+        for name in rows[0]
+        if name not in keys and name != "created"
+    }
+    return statement.on_conflict_do_update(
+        index_elements=list(keys), set_={**merged, "updated": func.now()}
+    )
+
+
+def _log_changes(session: AsyncSession, kind: str, keys: Iterable) -> None:
+    """Пишет изменения в журнал в той же транзакции, что и сами данные.
+
+    По журналу другие процессы обновляют свои индексы в памяти.
+    """
+    session.add_all(
+        ChangeLog(kind=kind, key=str(key), origin=dbase.storage.ORIGIN)
+        for key in keys
+    )
+
 
 async def orm_create_test_users(session: AsyncSession):
     query = select(User)
@@ -40,22 +98,39 @@ async def orm_create_test_users(session: AsyncSession):
 async def create_restrict_words_db(
     session: AsyncSession,
 ):
-    query = select(Words)
-    result = await session.execute(query)
-    words = result.scalars().first()
-    if words:
+    """Заполняет словарь из ban_words.txt.
+
+    В словарь, созданный до появления основ ("бляд*"), основы из файла
+    добавляются один раз - пока в нём нет ни одной записи со звёздочкой.
+    """
+    result = await session.execute(select(Words.word))
+    existing = set(result.scalars().all())
+    if any(STEM in word for word in existing):
         return
     restrict_words = set()
     with open("ban_words.txt", "r", encoding="utf-8") as f:
         for line in f:
             word = line.strip().lower()
-            if word:
+            if word and (not existing or STEM in word):
                 restrict_words.add(word)
-    words_to_add = [Words(word=word) for word in restrict_words]
+    words_to_add = [Words(word=word) for word in restrict_words - existing]
     session.add_all(words_to_add)
     await session.commit()
 
 
+async def _stream_rows(session: AsyncSession, query) -> AsyncIterator[Sequence]:
+    """Выполняет запрос серверным курсором и отдаёт строки пачками."""
+    result = await session.stream(
+        query.execution_options(yield_per=STREAM_CHUNK)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+def orm_stream_words(session: AsyncSession) -> AsyncIterator[Sequence]:
+    return _stream_rows(session, select(Words.word))
+
+
 async def orm_get_words(
     session: AsyncSession,
 ):
@@ -71,6 +146,7 @@ async def change_restrict_word(
     try:
         change = await orm_get_word_obj(session, old_word)
         change.word = new_word
+        _log_changes(session, "word", (old_word, new_word))
         await session.commit()
         return True
     except IntegrityError:
@@ -86,6 +162,7 @@ async def orm_get_word_obj(session: AsyncSession, word: str):
 
 async def orm_del_word_obj(session: AsyncSession, word: Words):
     await session.delete(word)
+    _log_changes(session, "word", (word.word,))
     await session.commit()
 
 
@@ -93,6 +170,7 @@ async def orm_add_word(session: AsyncSession, word: str):
     try:
         query = insert(Words).values(word=word)
         await session.execute(query)
+        _log_changes(session, "word", (word,))
         await session.commit()
     except Exception as e:
         logger.warning(f'Ошибка добавления слова "{word}" {e}')
@@ -110,21 +188,37 @@ async def orm_add_user(
     result = await session.execute(query)
     user = result.scalars().first()
     if user is None:
-        session.add(
-            User(
-                tele_id=tele_id,
-                name=name,
-                apartment=apartment,
-                phone=phone,
-                confirmed=confirmed,
-            )
+        user = User(
+            tele_id=tele_id,
+            name=name,
+            apartment=apartment,
+            phone=phone,
+            confirmed=confirmed,
         )
+        session.add(user)
     else:
         user.name = name or user.name
         user.apartment = apartment or user.apartment
         user.phone = phone or user.phone
         user.confirmed = confirmed
+    _log_changes(session, "user", (tele_id,))
+    _log_changes(session, "report", ("meter",))
     await session.commit()
+    dbase.storage.residents.put(user)
+    dbase.storage.reports.bump("meter")  # отчёт по воде берёт квартиру жильца
+
+
+async def orm_confirm_user(
+    session: AsyncSession, tele_id: int
+) -> Optional[User]:
+    user = await orm_get_user_tele(session, tele_id)
+    if user is None:
+        return None
+    user.confirmed = True
+    _log_changes(session, "user", (tele_id,))
+    await session.commit()
+    dbase.storage.residents.put(user)
+    return user
 
 
 async def orm_get_user_from_apartment(
@@ -145,6 +239,11 @@ async def orm_get_user_tele(session: AsyncSession, tele_id: int) -> User:
     return user
 
 
+async def orm_get_all_users(session: AsyncSession) -> Sequence[User]:
+    result = await session.execute(select(User))
+    return result.scalars().all()
+
+
 async def orm_get_users_confirm(session: AsyncSession) -> Sequence[User]:
     query = select(User).where(User.confirmed.is_(True))
     result = await session.execute(query)
@@ -152,38 +251,40 @@ async def orm_get_users_confirm(session: AsyncSession) -> Sequence[User]:
     return users
 
 
-async def orm_add_admins(
-    session: AsyncSession, admin_tele_ids: list[int], chat_id, bot: Bot
-) -> None:
+async def orm_add_admins(session: AsyncSession, admins: dict[int, str]) -> None:
+    """Записывает полный список админов: tele_id -> имя в чате.
 
-    query = select(User).where(User.tele_id.in_(admin_tele_ids))
+    Пользователи с флагом admin, которых нет в списке, его теряют;
+    после записи список становится ростером для IsAdmin.
+    """
+    admin_tele_ids = set(admins)
+    query = select(User).where(
+        or_(User.tele_id.in_(admin_tele_ids), User.admin.is_(True))
+    )
     result = await session.execute(query)
     existing_users_list = result.scalars().all()
     existing_users = {user.tele_id: user for user in existing_users_list}
-    existing_users_set = set(existing_users.keys())
-    admin_to_del = existing_users_set - set(admin_tele_ids)
-    admin_to_add = set(admin_tele_ids) - existing_users_set
-
-    for tele_id in admin_tele_ids:
-        if tele_id in existing_users_set:
-            existing_users[tele_id].admin = True
-
-    for admin in existing_users_list:
-        if admin.tele_id in admin_to_del:
-            admin.admin = False
-    for user in admin_to_add:
-        chat_member = await bot.get_chat_member(chat_id, user)
-        full_name = chat_member.user.full_name or f"Admin {user}"
-        session.add(
-            User(
-                tele_id=user,
-                name=full_name,
-                apartment=NUMBER_TSJ,
-                confirmed=True,
-                admin=True,
-            )
+    admin_to_add = admin_tele_ids - set(existing_users)
+
+    for user in existing_users_list:
+        user.admin = user.tele_id in admin_tele_ids
+
+    new_admins = [
+        User(
+            tele_id=user,
+            name=admins[user] or f"Admin {user}",
+            apartment=NUMBER_TSJ,
+            confirmed=True,
+            admin=True,
         )
+        for user in admin_to_add
+    ]
+    session.add_all(new_admins)
+    _log_changes(session, "user", {*existing_users, *admin_to_add})
     await session.commit()
+    for user in [*existing_users_list, *new_admins]:
+        dbase.storage.residents.put(user)
+    dbase.storage.chat_admins.set_roster(admin_tele_ids)
 
 
 async def orm_get_admin_list(session: AsyncSession) -> Sequence[User]:
@@ -208,10 +309,29 @@ async def orm_get_users_to_apart(
 async def orm_del_user(session: AsyncSession, user_tele_id: int) -> bool:
     query = delete(User).where(User.tele_id == user_tele_id)
     result = await session.execute(query)
+    _log_changes(session, "user", (user_tele_id,))
+    _log_changes(session, "report", ("meter",))
     await session.commit()
+    dbase.storage.residents.remove(user_tele_id)
+    dbase.storage.reports.bump("meter")
     return result.rowcount > 0
 
 
+async def orm_del_users(session: AsyncSession, user_tele_ids: list[int]) -> int:
+    """Удаляет пользователей одним запросом."""
+    if not user_tele_ids:
+        return 0
+    query = delete(User).where(User.tele_id.in_(user_tele_ids))
+    result = await session.execute(query)
+    _log_changes(session, "user", user_tele_ids)
+    _log_changes(session, "report", ("meter",))
+    await session.commit()
+    for user_tele_id in user_tele_ids:
+        dbase.storage.residents.remove(user_tele_id)
+    dbase.storage.reports.bump("meter")
+    return result.rowcount
+
+
 async def orm_get_phone(session: AsyncSession, phone: str) -> Union[str, None]:
     query = select(User).where(User.phone == phone)
     result = await session.execute(query)
@@ -254,36 +374,95 @@ async def orm_add_update_meter(
     water_hot_kitchen: Optional[int] = None,
     water_cold_kitchen: Optional[int] = None,
 ):
+    """Добавляет показания в журнал и обновляет сводку месяца в Meter.
+
+    В сводке меняются только переданные счётчики, 0 - допустимое значение.
+    """
+    values = {
+        "water_hot_bath": water_hot_bath,
+        "water_cold_bath": water_cold_bath,
+        "water_hot_kitchen": water_hot_kitchen,
+        "water_cold_kitchen": water_cold_kitchen,
+    }
+    values = {
+        kind: int(value) for kind, value in values.items() if value is not None
+    }
+    if not values:
+        return
+    resident = dbase.storage.residents.get(user_id)
+    # created и period - по одним часам, иначе показание на границе
+    # месяца попадает в отчёт другого месяца
     now = datetime.now()
-    query = (
-        select(Meter)
-        .where(
-            Meter.user_id == user_id,
-            func.extract("year", Meter.created) == now.year,
-            func.extract("month", Meter.created) == now.month,
+    session.add_all(
+        MeterReading(
+            user_id=user_id,
+            apartment=resident.apartment if resident else None,
+            kind=kind,
+            value=value,
         )
-        .order_by(desc(Meter.created))
+        for kind, value in values.items()
     )
-    result = await session.execute(query)
-    meter = result.scalars().first()
-    if meter is None:
-        session.add(
-            Meter(
-                user_id=user_id,
-                water_hot_bath=water_hot_bath,
-                water_cold_bath=water_cold_bath,
-                water_hot_kitchen=water_hot_kitchen,
-                water_cold_kitchen=water_cold_kitchen,
-            )
+    await session.execute(
+        _upsert(
+            session,
+            Meter,
+            [
+                {
+                    "user_id": user_id,
+                    "created": now,
+                    "period": period_of(now),
+                    **dict.fromkeys(METER_KINDS),
+                    **values,
+                }
+            ],
+            ("user_id", "period"),
         )
-    else:
-        meter.user_id = user_id or meter.user_id
-        meter.water_hot_bath = water_hot_bath or meter.water_hot_bath
-        meter.water_cold_bath = water_cold_bath or meter.water_cold_bath
-        meter.water_hot_kitchen = water_hot_kitchen or meter.water_hot_kitchen
-        meter.water_cold_kitchen = (
-            water_cold_kitchen or meter.water_cold_kitchen
+    )
+    _log_changes(session, "report", ("meter",))
+    await session.commit()
+    dbase.storage.reports.bump("meter")
+
+
+async def orm_get_user_readings(
+    session: AsyncSession,
+    user_id: int,
+    kind: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> list[MeterReading]:
+    """История показаний пользователя, от старых к новым.
+
+    limit - только столько последних записей.
+    """
+    query = select(MeterReading).where(MeterReading.user_id == user_id)
+    if kind:
+        query = query.where(MeterReading.kind == kind)
+    query = query.order_by(desc(MeterReading.created), desc(MeterReading.id))
+    result = await session.execute(query.limit(limit))
+    return list(reversed(result.scalars().all()))
+
+
+async def orm_backfill_readings(session: AsyncSession) -> None:
+    """Переносит в пустой журнал показания из существующих записей Meter."""
+    if (await session.execute(select(MeterReading.id).limit(1))).first():
+        return
+    result = await session.execute(
+        select(Meter, User.apartment).outerjoin(
+            User, User.tele_id == Meter.user_id
+        )
+    )
+    session.add_all(
+        MeterReading(
+            user_id=meter.user_id,
+            apartment=apartment,
+            kind=kind,
+            value=getattr(meter, kind),
+            created=meter.updated or meter.created,
+            updated=meter.updated or meter.created,
         )
+        for meter, apartment in result.all()
+        for kind in METER_KINDS
+        if getattr(meter, kind) is not None
+    )
     await session.commit()
 
 
@@ -295,39 +474,61 @@ async def orm_add_update_power(
     t2: int,
 ) -> bool:
     try:
-        now = datetime.now()
-        query = (
-            select(Power)
-            .where(
-                Power.apartment == apartment,
-                func.extract("year", Power.created) == now.year,
-                func.extract("month", Power.created) == now.month,
-            )
-            .order_by(desc(Power.created))
-        )
-        result = await session.execute(query)
-        power = result.scalars().first()
-        if power is None:
-            session.add(
-                Power(
-                    apartment=apartment,
-                    t0=t0,
-                    t1=t1,
-                    t2=t2,
-                )
-            )
-        else:
-            power.apartment = apartment
-            power.t0 = t0
-            power.t1 = t1
-            power.t2 = t2
-        await session.commit()
+        await orm_add_update_powers(session, {apartment: (t0, t1, t2)})
         return True
-    except Exception:
+    except Exception as e:
+        logger.error(f"Ошибка записи показаний электроэнергии: {e}")
         await session.rollback()
         return False
 
 
+async def orm_get_last_power(
+    session: AsyncSession,
+) -> dict[int, tuple[int, int, int]]:
+    """Последние показания T0-T2 каждой квартиры до текущего месяца."""
+    start, _ = month_bounds()
+    last = (
+        select(Power.apartment, func.max(Power.created).label("created"))
+        .where(Power.created < start)
+        .group_by(Power.apartment)
+        .subquery()
+    )
+    query = select(Power.apartment, Power.t0, Power.t1, Power.t2).join(
+        last,
+        (Power.apartment == last.c.apartment)
+        & (Power.created == last.c.created),
+    )
+    result = await session.execute(query)
+    return {apartment: (t0, t1, t2) for apartment, t0, t1, t2 in result}
+
+
+async def orm_add_update_powers(
+    session: AsyncSession, readings: dict[int, tuple[int, int, int]]
+) -> int:
+    """Записывает показания многих квартир за текущий месяц одним запросом."""
+    if not readings:
+        return 0
+    now = datetime.now()  # created и period - по одним часам
+    rows = [
+        {
+            "apartment": apartment,
+            "created": now,
+            "period": period_of(now),
+            "t0": t0,
+            "t1": t1,
+            "t2": t2,
+        }
+        for apartment, (t0, t1, t2) in readings.items()
+    ]
+    await session.execute(
+        _upsert(session, Power, rows, ("apartment", "period"))
+    )
+    _log_changes(session, "report", ("power",))
+    await session.commit()
+    dbase.storage.reports.bump("power")
+    return len(readings)
+
+
 async def post_block_user(
     session: AsyncSession,
     user_tele_id: int,
@@ -347,7 +548,12 @@ async def post_block_user(
             unblock_time=unblock_time,
         )
         session.add(ban)
+        await session.flush()
+        _log_changes(session, "ban", (ban.id,))
         await session.commit()
+        dbase.storage.ban_index.add(
+            ban.id, user_tele_id, chat_id, False, unblock_time
+        )
         return ban.id
     except SQLAlchemyError as e:
         await session.rollback()
@@ -366,6 +572,35 @@ async def get_block_users(session: AsyncSession) -> Sequence[BanUsers]:
     return result.scalars().all()
 
 
+async def orm_delete_expired_bans(
+    session: AsyncSession, now: datetime
+) -> list[tuple[int, int]]:
+    """Удаляет истёкшие блокировки одним запросом.
+
+    Возвращает (id, user_tele_id) удалённых записей.
+    """
+    query = (
+        delete(BanUsers)
+        .where(
+            BanUsers.confirmed.is_(True),
+            BanUsers.unblock_time.is_not(None),
+            BanUsers.unblock_time <= now,
+        )
+        .returning(BanUsers.id, BanUsers.user_tele_id)
+    )
+    expired = [tuple(row) for row in await session.execute(query)]
+    _log_changes(session, "ban", (ban_id for ban_id, _ in expired))
+    await session.commit()
+    for ban_id, _ in expired:
+        dbase.storage.ban_index.discard(ban_id)
+    return expired
+
+
+async def get_all_block_records(session: AsyncSession) -> Sequence[BanUsers]:
+    result = await session.execute(select(BanUsers))
+    return result.scalars().all()
+
+
 async def get_block_obj(
     session: AsyncSession, id_block: int
 ) -> Optional[BanUsers]:
@@ -383,50 +618,244 @@ async def set_block(
     result = await session.execute(query)
     if result.rowcount == 0:
         raise ValueError(f"BanUsers with id={id_block} not found")
+    _log_changes(session, "ban", (id_block,))
     await session.commit()
+    if id_block in dbase.storage.ban_index.records:
+        dbase.storage.ban_index.set_confirmed(id_block, set_bool, unblock_time)
+    else:
+        ban = await session.get(BanUsers, id_block)
+        dbase.storage.ban_index.add(
+            ban.id, ban.user_tele_id, ban.chat_id, set_bool, unblock_time
+        )
 
 
 async def remove_block_user(session: AsyncSession, user_tele_id: int):
-    await session.execute(
-        delete(BanUsers).where(BanUsers.user_tele_id == user_tele_id)
+    result = await session.execute(
+        delete(BanUsers)
+        .where(BanUsers.user_tele_id == user_tele_id)
+        .returning(BanUsers.id)
     )
+    _log_changes(session, "ban", result.scalars().all())
     await session.commit()
+    dbase.storage.ban_index.discard_user(user_tele_id)
 
 
 async def remove_block_user_id(session: AsyncSession, id: int):
     await session.execute(delete(BanUsers).where(BanUsers.id == id))
+    _log_changes(session, "ban", (id,))
     await session.commit()
+    dbase.storage.ban_index.discard(id)
 
 
-################# METERS#######################################
-async def orm_get_all_meters_to_month(session: AsyncSession) -> Sequence[Meter]:
-    now = datetime.now()
+# METERS
+def _period(
+    start: Optional[datetime], end: Optional[datetime]
+) -> tuple[datetime, datetime]:
+    if start is None or end is None:
+        return month_bounds()
+    return start, end
+
+
+def _by_month(column) -> tuple:
+    """Сортировка по месяцу: строки отчёта идут листами помесячно."""
+    return extract("year", column), extract("month", column)
+
+
+def orm_stream_meters(
+    session: AsyncSession,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[Sequence]:
+    """Показания воды за период (по умолчанию текущий месяц).
+
+    Строки: квартира, 4 счётчика, дата списания - по месяцам, внутри
+    месяца по квартирам.
+    """
+    start, end = _period(start, end)
     query = (
-        select(Meter)
-        .join(User)
-        .options(joinedload(Meter.user))
+        select(
+            User.apartment,
+            Meter.water_hot_bath,
+            Meter.water_cold_bath,
+            Meter.water_hot_kitchen,
+            Meter.water_cold_kitchen,
+            Meter.created,
+        )
+        .join(User, User.tele_id == Meter.user_id)
+        .where(Meter.created >= start, Meter.created < end)
+        .order_by(
+            *_by_month(Meter.created), User.apartment, desc(Meter.created)
+        )
+    )
+    return _stream_rows(session, query)
+
+
+def orm_stream_energy(
+    session: AsyncSession,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[Sequence]:
+    """Показания электроэнергии за период: квартира, T0-T2, дата."""
+    start, end = _period(start, end)
+    query = (
+        select(Power.apartment, Power.t0, Power.t1, Power.t2, Power.created)
+        .where(Power.created >= start, Power.created < end)
+        .order_by(
+            *_by_month(Power.created), Power.apartment, desc(Power.created)
+        )
+    )
+    return _stream_rows(session, query)
+
+
+def orm_stream_meter_consumption(
+    session: AsyncSession,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[Sequence]:
+    """Расход воды за период по квартирам: разница с предыдущей сводкой.
+
+    Считается одним запросом оконной функцией lag.
+    """
+    start, end = _period(start, end)
+    window = {"partition_by": Meter.user_id, "order_by": Meter.created}
+    history = (
+        select(
+            Meter.user_id,
+            Meter.created,
+            *(
+                (
+                    getattr(Meter, kind)
+                    - func.lag(getattr(Meter, kind)).over(**window)
+                ).label(kind)
+                for kind in METER_KINDS
+            ),
+        )
+        .where(Meter.created < end)
+        .subquery()
+    )
+    query = (
+        select(
+            User.apartment,
+            *(getattr(history.c, kind) for kind in METER_KINDS),
+            history.c.created,
+        )
+        .join(User, User.tele_id == history.c.user_id)
+        .where(history.c.created >= start)
+        .order_by(*_by_month(history.c.created), User.apartment)
+    )
+    return _stream_rows(session, query)
+
+
+def orm_stream_energy_consumption(
+    session: AsyncSession,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[Sequence]:
+    """Расход электроэнергии за период по квартирам (T0, T1, T2)."""
+    start, end = _period(start, end)
+    window = {"partition_by": Power.apartment, "order_by": Power.created}
+    history = (
+        select(
+            Power.apartment,
+            Power.created,
+            *(
+                (
+                    getattr(Power, tariff)
+                    - func.lag(getattr(Power, tariff)).over(**window)
+                ).label(tariff)
+                for tariff in ("t0", "t1", "t2")
+            ),
+        )
+        .where(Power.created < end)
+        .subquery()
+    )
+    query = (
+        select(
+            history.c.apartment,
+            history.c.t0,
+            history.c.t1,
+            history.c.t2,
+            history.c.created,
+        )
+        .where(history.c.created >= start)
+        .order_by(*_by_month(history.c.created), history.c.apartment)
+    )
+    return _stream_rows(session, query)
+
+
+async def orm_get_meter_history(session: AsyncSession) -> list:
+    """Сводки показаний воды всех квартир по порядку дат.
+
+    Строки (квартира, дата, {счётчик: значение}) для поиска аномалий.
+    """
+    query = (
+        select(
+            User.apartment,
+            Meter.created,
+            *(getattr(Meter, kind) for kind in METER_KINDS),
+        )
+        .join(User, User.tele_id == Meter.user_id)
+        .order_by(User.apartment, Meter.created)
+    )
+    result = await session.execute(query)
+    return [
+        (apartment, created, dict(zip(METER_KINDS, values)))
+        for apartment, created, *values in result.all()
+    ]
+
+
+async def orm_get_power_history(session: AsyncSession) -> list:
+    """Показания электроэнергии всех квартир по порядку дат."""
+    query = select(
+        Power.apartment, Power.created, Power.t0, Power.t1, Power.t2
+    ).order_by(Power.apartment, Power.created)
+    result = await session.execute(query)
+    return [
+        (apartment, created, {"t0": t0, "t1": t1, "t2": t2})
+        for apartment, created, t0, t1, t2 in result.all()
+    ]
+
+
+async def orm_get_meter_points(
+    session: AsyncSession, user_id: int, kind: str
+) -> list[tuple[datetime, int]]:
+    """История счётчика воды пользователя до текущего месяца.
+
+    Показание текущего месяца заменяется новым, поэтому в историю
+    для сверки не входит.
+    """
+    start, _ = month_bounds()
+    column = getattr(Meter, kind)
+    query = (
+        select(Meter.created, column)
         .where(
-            extract("year", Meter.created) == now.year,
-            extract("month", Meter.created) == now.month,
+            Meter.user_id == user_id,
+            Meter.created < start,
+            column.is_not(None),
         )
-        .order_by(User.apartment, desc(Meter.created))
+        .order_by(Meter.created)
     )
     result = await session.execute(query)
-    return result.scalars().all()
+    return [tuple(row) for row in result.all()]
 
 
-async def orm_get_all_energy_to_month(session: AsyncSession) -> Sequence[Power]:
-    now = datetime.now()
+async def orm_get_power_points(
+    session: AsyncSession, apartment: int, tariff: str
+) -> list[tuple[datetime, int]]:
+    """История тарифа электросчётчика квартиры до текущего месяца."""
+    start, _ = month_bounds()
+    column = getattr(Power, tariff)
     query = (
-        select(Power)
+        select(Power.created, column)
         .where(
-            extract("year", Power.created) == now.year,
-            extract("month", Power.created) == now.month,
+            Power.apartment == apartment,
+            Power.created < start,
+            column.is_not(None),
         )
-        .order_by(Power.apartment, desc(Power.created))
+        .order_by(Power.created)
     )
     result = await session.execute(query)
-    return result.scalars().all()
+    return [tuple(row) for row in result.all()]
 
 
 async def orm_get_user_meters_last(
@@ -449,21 +878,193 @@ async def orm_get_meter_from_user_month_year(
     month: Union[int, None] = None,
     year: Union[int, None] = None,
 ) -> Union[Meter, None]:
-
-    if month is None:
-        month = datetime.now().month
-    if year is None:
-        year = datetime.now().year
-
+    start, end = month_bounds(year, month)
     query = (
         select(Meter)
         .where(
             Meter.user_id == user_id,
-            func.extract("year", Meter.created) == year,
-            func.extract("month", Meter.created) == month,
+            Meter.created >= start,
+            Meter.created < end,
         )
         .order_by(desc(Meter.created))
         .limit(1)
     )
     result = await session.execute(query)
     return result.scalars().first()
+
+
+# OUTBOX
+async def orm_add_outbox(
+    session: AsyncSession,
+    messages: list[dict],
+    batch: Optional[str] = None,
+    batch_info: Optional[dict] = None,
+) -> int:
+    """Ставит сообщения в очередь, пропуская уже известные ключи.
+
+    batch_info - поля OutboxBatch; запись рассылки создаётся вместе
+    с её сообщениями.
+    """
+    keys = [message["key"] for message in messages]
+    query = select(Outbox.key).where(Outbox.key.in_(keys))
+    existing = set((await session.execute(query)).scalars().all())
+    new_messages = [
+        Outbox(batch=batch, status="pending", **message)
+        for message in messages
+        if message["key"] not in existing
+    ]
+    if not new_messages:
+        return 0
+    if batch and batch_info:
+        query = select(OutboxBatch.id).where(OutboxBatch.batch == batch)
+        if (await session.execute(query)).first() is None:
+            session.add(OutboxBatch(batch=batch, **batch_info))
+    try:
+        session.add_all(new_messages)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        logger.warning(f"Повторная постановка сообщений в очередь: {e}")
+        return 0
+    return len(new_messages)
+
+
+async def orm_claim_outbox(session: AsyncSession, limit: int) -> list[Outbox]:
+    """Забирает пачку сообщений на отправку."""
+    query = (
+        select(Outbox)
+        .where(Outbox.status == "pending")
+        .order_by(Outbox.id)
+        .limit(limit)
+    )
+    rows = list((await session.execute(query)).scalars().all())
+    if rows:
+        await orm_set_outbox_status(
+            session, [row.id for row in rows], "sending"
+        )
+    return rows
+
+
+async def orm_set_outbox_status(
+    session: AsyncSession, ids: list[int], status: str
+) -> None:
+    await session.execute(
+        update(Outbox).where(Outbox.id.in_(ids)).values(status=status)
+    )
+    await session.commit()
+
+
+async def orm_reset_outbox_sending(session: AsyncSession) -> int:
+    """Помечает сообщения, прерванные перезапуском, как unknown."""
+    result = await session.execute(
+        update(Outbox)
+        .where(Outbox.status == "sending")
+        .values(status="unknown")
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def orm_get_outbox_batch(
+    session: AsyncSession, batch: str
+) -> Sequence[tuple[int, str]]:
+    query = select(Outbox.chat_id, Outbox.status).where(Outbox.batch == batch)
+    return (await session.execute(query)).all()
+
+
+async def orm_get_outbox_batch_info(
+    session: AsyncSession, batch: str
+) -> Optional[OutboxBatch]:
+    query = select(OutboxBatch).where(OutboxBatch.batch == batch)
+    return (await session.execute(query)).scalars().first()
+
+
+async def orm_finish_outbox_batch(session: AsyncSession, batch: str) -> bool:
+    """Помечает рассылку завершённой; False - это уже сделал другой процесс."""
+    result = await session.execute(
+        update(OutboxBatch)
+        .where(OutboxBatch.batch == batch, OutboxBatch.finished.is_(False))
+        .values(finished=True)
+    )
+    await session.commit()
+    return result.rowcount > 0
+
+
+async def orm_get_outbox_messages(
+    session: AsyncSession, batch: str
+) -> Sequence[Outbox]:
+    query = select(Outbox).where(Outbox.batch == batch).order_by(Outbox.id)
+    return (await session.execute(query)).scalars().all()
+
+
+# FSM
+async def orm_get_fsm(session: AsyncSession, key: str) -> Optional[FsmRecord]:
+    query = select(FsmRecord).where(FsmRecord.key == key)
+    return (await session.execute(query)).scalars().first()
+
+
+async def orm_save_fsm(
+    session: AsyncSession, rows: list[dict], deleted: list[str]
+) -> None:
+    """Сохраняет пачку состояний и удаляет пустые одной транзакцией."""
+    if rows:
+        await session.execute(
+            _upsert(session, FsmRecord, rows, ("key",), merge=False)
+        )
+    if deleted:
+        await session.execute(
+            delete(FsmRecord).where(FsmRecord.key.in_(deleted))
+        )
+    await session.commit()
+
+
+# CHANGE LOG
+
+
+async def orm_get_last_change_id(session: AsyncSession) -> int:
+    result = await session.execute(select(func.max(ChangeLog.id)))
+    return result.scalar() or 0
+
+
+async def orm_get_changes(
+    session: AsyncSession, after_id: int, ids: Iterable[int], limit: int
+) -> Sequence[ChangeLog]:
+    """Записи журнала после after_id и пропущенные ранее записи ids."""
+    query = (
+        select(ChangeLog)
+        .where(or_(ChangeLog.id > after_id, ChangeLog.id.in_(list(ids))))
+        .order_by(ChangeLog.id)
+        .limit(limit)
+    )
+    result = await session.execute(query)
+    return result.scalars().all()
+
+
+async def orm_prune_changes(session: AsyncSession, before: datetime) -> int:
+    result = await session.execute(
+        delete(ChangeLog).where(ChangeLog.created < before)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def orm_get_words_in(session: AsyncSession, words: Iterable[str]) -> set:
+    query = select(Words.word).where(Words.word.in_(list(words)))
+    result = await session.execute(query)
+    return set(result.scalars().all())
+
+
+async def orm_get_bans_in(
+    session: AsyncSession, ids: Iterable[int]
+) -> Sequence[BanUsers]:
+    query = select(BanUsers).where(BanUsers.id.in_(list(ids)))
+    result = await session.execute(query)
+    return result.scalars().all()
+
+
+async def orm_get_users_in(
+    session: AsyncSession, tele_ids: Iterable[int]
+) -> Sequence[User]:
+    query = select(User).where(User.tele_id.in_(list(tele_ids)))
+    result = await session.execute(query)
+    return result.scalars().all()
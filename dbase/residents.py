@@ -0,0 +1,107 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, NamedTuple, Optional
+
+
+class Resident(NamedTuple):
+    tele_id: int
+    name: Optional[str]
+    apartment: Optional[int]
+    phone: Optional[str]
+    confirmed: bool
+    admin: bool
+
+
+def _to_apartment(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResidentDirectory:
+    """Справочник жильцов в памяти процесса.
+
+    Жильцы доступны по tele_id и через отсортированный по квартирам
+    массив, по которому выбираются диапазоны квартир подъезда.
+    """
+
+    def __init__(self) -> None:
+        self.by_tele: dict[int, Resident] = {}
+        self._apartments: list[tuple[int, int]] = []
+
+    def load(self, users: Iterable) -> None:
+        self.by_tele.clear()
+        self._apartments.clear()
+        for user in users:
+            resident = self._from_user(user)
+            self.by_tele[resident.tele_id] = resident
+            if resident.apartment is not None:
+                self._apartments.append((resident.apartment, resident.tele_id))
+        self._apartments.sort()
+
+    @staticmethod
+    def _from_user(user) -> Resident:
+        return Resident(
+            tele_id=user.tele_id,
+            name=user.name,
+            apartment=_to_apartment(user.apartment),
+            phone=user.phone,
+            confirmed=bool(user.confirmed),
+            admin=bool(user.admin),
+        )
+
+    def put(self, user) -> Resident:
+        """Добавляет или обновляет жильца по объекту User."""
+        self.remove(user.tele_id)
+        resident = self._from_user(user)
+        self.by_tele[resident.tele_id] = resident
+        if resident.apartment is not None:
+            insort(self._apartments, (resident.apartment, resident.tele_id))
+        return resident
+
+    def remove(self, tele_id: int) -> None:
+        resident = self.by_tele.pop(tele_id, None)
+        if resident is None or resident.apartment is None:
+            return
+        key = (resident.apartment, tele_id)
+        index = bisect_left(self._apartments, key)
+        if index < len(self._apartments) and self._apartments[index] == key:
+            del self._apartments[index]
+
+    def get(self, tele_id: int) -> Optional[Resident]:
+        return self.by_tele.get(tele_id)
+
+    def is_confirmed(self, tele_id: int) -> bool:
+        resident = self.by_tele.get(tele_id)
+        return resident is not None and resident.confirmed
+
+    def get_range(
+        self, start_apart: int, fnsh_apart: int, confirmed: bool = True
+    ) -> list[Resident]:
+        """Жильцы квартир start_apart..fnsh_apart включительно."""
+        left = bisect_left(self._apartments, (start_apart,))
+        right = bisect_right(self._apartments, (fnsh_apart, float("inf")))
+        residents = [
+            self.by_tele[tele_id] for _, tele_id in self._apartments[left:right]
+        ]
+        if confirmed:
+            return [resident for resident in residents if resident.confirmed]
+        return residents
+
+    def get_confirmed(self) -> list[Resident]:
+        return [
+            self.by_tele[tele_id]
+            for _, tele_id in self._apartments
+            if self.by_tele[tele_id].confirmed
+        ]
+
+    def get_by_apartment(self, apartment) -> Optional[Resident]:
+        """Жилец квартиры, подтверждённый в приоритете."""
+        apartment = _to_apartment(apartment)
+        if apartment is None:
+            return None
+        residents = self.get_range(apartment, apartment, confirmed=False)
+        for resident in residents:
+            if resident.confirmed:
+                return resident
+        return residents[0] if residents else None
@@ -1 +1,20 @@
-restricted_words = set()
+import uuid
+
+from common.chat_admins import ChatAdminCache
+from common.report_cache import ReportCache
+from common.text_normalize import normalize_text
+from common.word_matcher import WordMatcher, load_exceptions
+from dbase.ban_index import BanIndex
+from dbase.residents import ResidentDirectory
+from handlers.const import ADMIN_CACHE_TTL
+
+restricted_words = WordMatcher(
+    normalize=normalize_text, exceptions=load_exceptions("ban_exceptions.txt")
+)
+ban_index = BanIndex()
+chat_admins = ChatAdminCache(ttl=ADMIN_CACHE_TTL)
+residents = ResidentDirectory()
+reports = ReportCache()
+
+# метка процесса в журнале изменений: свои записи процесс не применяет
+ORIGIN = uuid.uuid4().hex
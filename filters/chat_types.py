@@ -1,8 +1,7 @@
-from aiogram import Bot, types
+from aiogram import types
 from aiogram.filters import Filter
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from dbase.orm_query import orm_get_confirmed
+import dbase.storage
 
 
 class ChatTypeFilter(Filter):
@@ -17,16 +16,13 @@ class IsAdmin(Filter):
     def __init__(self) -> None:
         pass
 
-    async def __call__(self, message: types.Message, bot: Bot) -> bool:
-        return message.from_user.id in bot.my_admin_list
+    async def __call__(self, message: types.Message) -> bool:
+        return dbase.storage.chat_admins.is_admin(message.from_user.id)
 
 
 class IsConfirmedUser(Filter):
     def __init__(self) -> None:
         pass
 
-    async def __call__(
-        self, message: types.Message, bot: Bot, session: AsyncSession
-    ) -> bool:
-        user_tele_id = message.from_user.id
-        return await orm_get_confirmed(session, user_tele_id)
+    async def __call__(self, message: types.Message) -> bool:
+        return dbase.storage.residents.is_confirmed(message.from_user.id)
@@ -1,6 +1,9 @@
+from datetime import datetime
+
 from aiogram import types
 from aiogram.fsm.context import FSMContext
 
+from common.anomaly import REASONS, check_value
 from handlers.const import APARTMENTCOUNT
 
 
@@ -28,6 +31,37 @@ async def validate_data_meter(
     return True
 
 
+async def confirm_anomaly(
+    message: types.Message,
+    state: FSMContext,
+    points: list,
+    kind: str,
+    value: int,
+) -> bool:
+    """Сверяет показание с историей счётчика.
+
+    Необычное показание (скачок, нулевой расход, уменьшение) сохраняется
+    только после повторного ввода того же значения.
+    """
+    reason, typical = check_value(points, datetime.now(), value)
+    if reason is None:
+        return True
+    data = await state.get_data()
+    if data.get("anomaly") == f"{kind}:{value}":
+        await state.update_data(anomaly=None)
+        return True
+    await state.update_data(anomaly=f"{kind}:{value}")
+    text = (
+        f"Показание {value} выглядит необычно: {REASONS[reason]}."
+        f"\nПредыдущее показание: {points[-1][1]}"
+    )
+    if typical is not None:
+        text += f"\nОбычный расход: {typical:.0f} в месяц."
+    text += "\nЕсли показание верное, введите его ещё раз."
+    await message.answer(text)
+    return False
+
+
 async def validate_porch(message: types.Message) -> bool:
     num_porch = message.text
     if not num_porch.isdigit() or int(num_porch) > 5:
@@ -46,5 +80,4 @@ async def validate_apart(message: types.Message) -> bool:
             f"Номер квартиры не может быть больше {APARTMENTCOUNT}"
         )
         return False
-    print("validate_apart==True")
     return True
@@ -1,68 +1,111 @@
+import asyncio
 import datetime
+import hashlib
 import logging
+import time
 from io import BytesIO
 
 from aiogram import Bot, F, Router, types
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.methods import BanChatMember
-from aiogram.types import BufferedInputFile
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
-from openpyxl.utils import get_column_letter
-from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram.types import BufferedInputFile, InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 import dbase.storage
 
+from common.anomaly import REASONS, find_anomalies
+from common.broadcast import BroadcastResult
+from common.excel_report import (
+    ReportSheet,
+    build_report,
+    created_month,
+    format_consumption,
+    format_reading,
+)
+from common.outbox import OutboxDispatcher, OutboxMessage
+from common.periods import (
+    current_period,
+    format_period,
+    month_bounds,
+    parse_period,
+    period_months,
+)
+from common.power_import import (
+    rows_from_csv,
+    rows_from_text,
+    rows_from_xlsx,
+    validate_power_rows,
+)
+from dbase.models import OutboxBatch
 from dbase.orm_query import (
     change_restrict_word,
     orm_add_update_meter,
     orm_add_word,
     orm_del_user,
+    orm_del_users,
     orm_del_word_obj,
-    orm_get_all_meters_to_month,
+    orm_stream_meters,
     orm_get_unconfirmed_user_last,
-    orm_get_user_apartment,
     orm_get_user_meters_last,
+    orm_get_user_readings,
     orm_get_user_tele,
-    orm_get_users_confirm,
-    orm_get_users_to_apart,
     orm_get_word_obj,
-    orm_get_words,
     get_block_obj,
     set_block,
     post_block_user,
     orm_get_count_need_confirmed,
-    orm_get_all_energy_to_month,
+    orm_stream_energy,
+    orm_stream_energy_consumption,
+    orm_stream_meter_consumption,
+    orm_stream_words,
     orm_add_update_power,
+    orm_add_update_powers,
+    orm_get_last_power,
+    orm_get_meter_history,
+    orm_get_meter_points,
+    orm_get_outbox_messages,
+    orm_get_power_history,
+    orm_get_power_points,
     remove_block_user_id,
+    orm_confirm_user,
 )
 from filters.chat_types import ChatTypeFilter, IsAdmin
 from filters.data_filter import (
+    confirm_anomaly,
     validate_apart,
     validate_data_meter,
     validate_porch,
 )
-from handlers.const import PORCH_APART, APARTMENTCOUNT
+from handlers.const import (
+    APARTMENTCOUNT,
+    IMPORT_MAX_SIZE,
+    MESSAGE_LIMIT,
+    METER_LOG_LIMIT,
+    PORCH_APART,
+    REPORT_MAX_MONTHS,
+)
 from handlers.states import (
     ChangeMeter,
     ChangeWords,
     PorchMessage,
     SetApart,
     GetPower,
+    ImportPower,
+    ReportPeriod,
 )
 from kbds.kbds import (
     btns,
     btns_admin,
     btns_cnl,
     btns_edit_del_new,
+    btns_period,
     btns_yes_no,
     get_user_main_btns,
 )
 
 logger = logging.getLogger(__name__)
 
-user_private_admin_router = Router()
+user_private_admin_router = Router(name="user_private_admin_router")
 user_private_admin_router.message.filter(ChatTypeFilter(["private"]), IsAdmin())
 user_private_admin_router.callback_query.filter(IsAdmin())
 
@@ -142,7 +185,7 @@ async def state_enter_edit_word_cmd(
             "Слово не найдено.", reply_markup=get_user_main_btns(btns)
         )
         return
-    await state.update_data(old_word=word_obj)
+    await state.update_data(old_word=word_obj.word)
     await message.answer(f'Принято слово для изменения "{word}"')
     await message.answer("Введите слово, на которое нужно заменить:")
     await state.set_state(ChangeWords.input_word)
@@ -160,11 +203,12 @@ async def input_word_cmd(
         return
 
     data = await state.get_data()
-    old_word = data.get("old_word").word
+    old_word = data.get("old_word")
     change = await change_restrict_word(
         session, old_word=old_word, new_word=new_word
     )
     if change:
+        dbase.storage.restricted_words.replace(old_word, new_word)
         await message.answer(
             f'Слово "{old_word}" успешно заменено на "{new_word}".'
         )
@@ -214,7 +258,12 @@ async def delete_word_cmd(
 
 @user_private_admin_router.callback_query(F.data == "add_word")
 async def add_word_cmd(callback: types.CallbackQuery, state: FSMContext):
-    await callback.message.edit_text(f"Введите запрещённое слово.")
+    await callback.message.edit_text(
+        "Введите запрещённое слово.\n"
+        "Слово ищется целиком; чтобы ловить словоформы, добавьте "
+        '"*" в конце основы ("бляд*"), склеенные слова - '
+        '"*" с обеих сторон ("*бляд*").'
+    )
     await state.set_state(ChangeWords.add_word)
 
 
@@ -246,30 +295,21 @@ async def enter_add_word_cmd(
 
 async def generate_excel_in_memory_words(
     session: AsyncSession,
-):
+) -> BytesIO:
     """Создаёт Excel-файл в памяти"""
-    workbook = Workbook()
-    sheet = workbook.active
     table_name = "Запрещённые слова"
-    sheet.append([table_name])
-    words = await orm_get_words(session)
-    max_ln = len(table_name)
-
-    for word in words:
-        sheet.append([word])
-        max_ln = max(max_ln, len(word))
-
-    column_letter = get_column_letter(1)
-    sheet.column_dimensions[column_letter].width = max_ln + 2
-    sheet[column_letter][0].alignment = Alignment(
-        horizontal="center", vertical="center"
+    width = max(map(len, dbase.storage.restricted_words), default=0)
+    return await build_report(
+        [
+            ReportSheet(
+                table_name,
+                [table_name],
+                orm_stream_words(session),
+                widths=[max(width, len(table_name)) + 2],
+            )
+        ]
     )
 
-    virtual_workbook = BytesIO()
-    workbook.save(virtual_workbook)
-    virtual_workbook.seek(0)
-    return virtual_workbook
-
 
 @user_private_admin_router.callback_query(F.data == "get_words")
 async def get_word_cmd(callback: types.CallbackQuery, session: AsyncSession):
@@ -395,18 +435,28 @@ async def confirm_user_cmd(
 async def conf_user_cmd(
     callback: types.CallbackQuery,
     session: AsyncSession,
-    bot: Bot,
     state: FSMContext,
+    outbox: OutboxDispatcher,
 ):
     await callback.answer()
     tele_id = int(callback.data.split("_")[-1])
     logger.info(f"confirm {tele_id}")
-    user = await orm_get_user_tele(session, tele_id)
-    user.confirmed = True
-    await session.commit()
-    await bot.send_message(
-        chat_id=user.tele_id,
-        text=f"✅ Вас подтвердили! Добро пожаловать, {user.name}.",
+    user = await orm_confirm_user(session, tele_id)
+    if user is None:  # удалён, пока заявка ждала подтверждения
+        await callback.message.edit_text(
+            f"Пользователь {tele_id} не найден - возможно, уже удалён."
+        )
+        await start_cmd(callback.message, state, session)
+        return
+    await outbox.enqueue(
+        session,
+        [
+            OutboxMessage(
+                f"confirm:{user.tele_id}:{datetime.date.today().isoformat()}",
+                user.tele_id,
+                f"✅ Вас подтвердили! Добро пожаловать, {user.name}.",
+            )
+        ],
     )
     await callback.message.edit_text(
         f"Пользователь {user.name} - кв {user.apartment} подтвержден."
@@ -477,7 +527,7 @@ async def input_apart(
     message: types.Message, session: AsyncSession, state: FSMContext
 ):
     if await validate_apart(message):
-        user = await orm_get_user_apartment(session, message.text)
+        user = dbase.storage.residents.get_by_apartment(message.text)
         if user is None:
             await message.answer("Квартира не найдена")
             await start_cmd(message, state, session)
@@ -530,62 +580,153 @@ async def send_msg_porch(
     session: AsyncSession,
     bot: Bot,
     state: FSMContext,
+    outbox: OutboxDispatcher,
 ):
     if callback.data == "yes":
+        await callback.answer()
         data = await state.get_data()
         porch = int(data.get("porch"))
+        text = data.get("text")
         aparts = PORCH_APART[porch]
-        users = await orm_get_users_to_apart(session, aparts[0], aparts[1])
-        for user in users:
-            try:
-                await bot.send_message(user.tele_id, text=data.get("text"))
-            except TelegramForbiddenError:
-                await orm_del_user(session, user.tele_id)
-                txt = (
-                    f"Пользователь {user.tele_id} - {user.apartment} "
-                    "заблокировал бота и был удалён."
-                )
-                await bot.send_message(callback.from_user.id, text=txt)
-            except TelegramBadRequest as e:
-                print(f"Неверный запрос при отправке {user.tele_id}: {e}")
-            except Exception as e:
-                print(f"Неизвестная ошибка при отправке {user.tele_id}: {e}")
-        await callback.answer("Сообщения разосланы", show_alert=True)
+        users = dbase.storage.residents.get_range(aparts[0], aparts[1])
+        # Одинаковое сообщение в подъезд за день отправляется один раз
+        batch = (
+            f"porch:{porch}:{datetime.date.today().isoformat()}:"
+            f"{hashlib.sha1(text.encode()).hexdigest()[:16]}"
+        )
+        status = await callback.message.answer(
+            f"Рассылка в {porch} подъезд поставлена в очередь."
+        )
+        added = await outbox.enqueue(
+            session,
+            [
+                OutboxMessage(f"{batch}:{user.tele_id}", user.tele_id, text)
+                for user in users
+            ],
+            batch=batch,
+            title=f"Сообщение в {porch} подъезд",
+            status=status,
+            admin_tele_id=callback.from_user.id,
+        )
+        if not added:
+            await offer_resend(
+                status, batch, "Это сообщение сегодня уже отправлялось."
+            )
     elif callback.data == "cancel":
         await state.clear()
         await callback.answer("Отправка отменена", show_alert=True)
     await start_cmd(callback.message, state, session)
 
 
+async def del_blocked_users(
+    bot: Bot,
+    session: AsyncSession,
+    info: OutboxBatch,
+    result: BroadcastResult,
+):
+    """Удаляет заблокировавших бота после рассылки и шлёт одну сводку.
+
+    Вызывается процессом, разославшим batch, поэтому квартиры берутся
+    из его индекса жильцов, а получатель сводки - из записи OutboxBatch.
+    """
+    if not result.forbidden or not info.admin_tele_id:
+        return
+    residents = [
+        resident
+        for resident in map(dbase.storage.residents.get, result.forbidden)
+        if resident is not None
+    ]
+    await orm_del_users(session, result.forbidden)
+    apartments = sorted(resident.apartment for resident in residents)
+    txt = (
+        f"Заблокировали бота и удалены {len(result.forbidden)} "
+        f"пользователей.\nКвартиры: {', '.join(map(str, apartments))}"
+    )
+    await bot.send_message(info.admin_tele_id, text=txt)
+
+
 @user_private_admin_router.callback_query(F.data.startswith("get_meter_all"))
 async def get_meter_all_cmd(
-    callback: types.CallbackQuery, session: AsyncSession, bot: Bot
+    callback: types.CallbackQuery,
+    session: AsyncSession,
+    bot: Bot,
+    outbox: OutboxDispatcher,
 ):
-    users = await orm_get_users_confirm(session)
-    for user in users:
-        try:
-            await bot.send_message(
+    await callback.answer()
+    users = dbase.storage.residents.get_confirmed()
+    batch = f"get_meter_all:{datetime.date.today().isoformat()}"
+    status = await callback.message.answer(
+        "Запрос показаний поставлен в очередь."
+    )
+    added = await outbox.enqueue(
+        session,
+        [
+            OutboxMessage(
+                f"{batch}:{user.tele_id}",
                 user.tele_id,
                 "Здравствуйте.\nПрошу Вас передать "
                 "показания приборов учёта.",
-                reply_markup=get_user_main_btns(btns),
+                get_user_main_btns(btns),
             )
-        except TelegramForbiddenError:
-            print(
-                f"Пользователь {user.tele_id} - "
-                f"{user.apartment} заблокировал бота"
-            )
-            await orm_del_user(session, user.tele_id)
-            txt = (
-                f"Пользователь {user.tele_id} - {user.apartment} "
-                "заблокировал бота и был удалён."
-            )
-            await bot.send_message(callback.from_user.id, text=txt)
-        except TelegramBadRequest as e:
-            print(f"Неверный запрос при отправке {user.tele_id}: {e}")
-        except Exception as e:
-            print(f"Неизвестная ошибка при отправке {user.tele_id}: {e}")
+            for user in users
+        ],
+        batch=batch,
+        title="Запрос показаний воды",
+        status=status,
+        admin_tele_id=callback.from_user.id,
+    )
+    if not added:
+        await offer_resend(
+            status, batch, "Показания сегодня уже запрашивались."
+        )
+
+
+async def offer_resend(status: types.Message, batch: str, text: str):
+    """Повтор рассылки с тем же ключом не отправляется - спрашиваем админа."""
+    await status.edit_text(
+        f"{text}\nОтправить ещё раз?",
+        reply_markup=get_user_main_btns(
+            {"Отправить повторно": f"resend:{batch}"}
+        ),
+    )
+
+
+@user_private_admin_router.callback_query(F.data.startswith("resend:"))
+async def resend_batch_cmd(
+    callback: types.CallbackQuery,
+    session: AsyncSession,
+    bot: Bot,
+    outbox: OutboxDispatcher,
+):
+    """Повторяет рассылку теми же сообщениями под новым ключом."""
     await callback.answer()
+    batch = callback.data.removeprefix("resend:")
+    rows = await orm_get_outbox_messages(session, batch)
+    if not rows:
+        await callback.message.edit_text("Рассылка не найдена.")
+        return
+    resend = f"{batch}:r{int(time.time())}"
+    await callback.message.edit_text("Повторная рассылка поставлена в очередь.")
+    await outbox.enqueue(
+        session,
+        [
+            OutboxMessage(
+                f"{resend}:{row.chat_id}",
+                row.chat_id,
+                row.text,
+                (
+                    InlineKeyboardMarkup.model_validate_json(row.reply_markup)
+                    if row.reply_markup
+                    else None
+                ),
+            )
+            for row in rows
+        ],
+        batch=resend,
+        title="Повторная рассылка",
+        status=callback.message,
+        admin_tele_id=callback.from_user.id,
+    )
 
 
 @user_private_admin_router.callback_query(F.data == "get_data_apart")
@@ -603,7 +744,7 @@ async def show_meter_info(
     state: FSMContext,
     apartment: str,
 ):
-    user = await orm_get_user_apartment(session, apartment)
+    user = dbase.storage.residents.get_by_apartment(apartment)
     if user is None:
         await message.answer("Квартира не найдена")
         await start_cmd(message, state, session)
@@ -628,10 +769,39 @@ async def show_meter_info(
         user_info = "Показания не обнаружены"
 
     await message.answer(
-        user_info, parse_mode="HTML", reply_markup=get_user_main_btns(btns_cnl)
+        user_info,
+        parse_mode="HTML",
+        reply_markup=get_user_main_btns(
+            {"📜 История подачи": f"meter_log_{user.tele_id}", **btns_cnl}
+        ),
     )
 
 
+@user_private_admin_router.callback_query(F.data.startswith("meter_log_"))
+async def meter_log_cmd(callback: types.CallbackQuery, session: AsyncSession):
+    """Когда и какие показания передавал жилец - из журнала MeterReading."""
+    await callback.answer()
+    tele_id = int(callback.data.removeprefix("meter_log_"))
+    readings = await orm_get_user_readings(
+        session, tele_id, limit=METER_LOG_LIMIT
+    )
+    if not readings:
+        await callback.message.answer("Жилец ещё не передавал показания.")
+        return
+    names = {kind: name for name, kind in btns.items()}
+    text = f"Последние {len(readings)} переданных показаний:\n"
+    for reading in readings:
+        line = (
+            f"{reading.created:%d.%m.%Y %H:%M} "
+            f"{names.get(reading.kind, reading.kind)}: {reading.value}"
+        )
+        if len(text) + len(line) + 1 > MESSAGE_LIMIT:
+            await callback.message.answer(text)
+            text = ""
+        text += line + "\n"
+    await callback.message.answer(text)
+
+
 @user_private_admin_router.message(SetApart.apartment, F.text)
 async def send_info_apart(
     message: types.Message, session: AsyncSession, state: FSMContext
@@ -642,143 +812,221 @@ async def send_info_apart(
     await show_meter_info(message, session, state, message.text)
 
 
+WATER_HEADER = [
+    "Квартира",
+    "Горячая вода (ванна)",
+    "Холодная вода (ванна)",
+    "Горячая вода (кухня)",
+    "Холодная вода (кухня)",
+    "Дата списания",
+]
+ENERGY_HEADER = ["Квартира", "Т0", "Т1", "Т2", "Дата списания"]
+
+
 async def generate_excel_in_memory(
     session: AsyncSession,
-):
-    """Создаёт Excel-файл в памяти"""
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.append(
+    start: datetime.datetime,
+    end: datetime.datetime,
+) -> BytesIO:
+    """Создаёт Excel-файл в памяти, лист на каждый месяц"""
+    return await build_report(
         [
-            "Квартира",
-            "Горячая вода (ванна)",
-            "Холодная вода (ванна)",
-            "Горячая вода (кухня)",
-            "Холодная вода (кухня)",
-            "Дата списания",
+            ReportSheet(
+                "Вода",
+                WATER_HEADER,
+                orm_stream_meters(session, start, end),
+                format_reading,
+                split=created_month,
+            )
         ]
     )
-    meters = await orm_get_all_meters_to_month(session)
-    print(f"Найдено записей: {len(meters)}")
-
-    for i, meter in enumerate(meters):
-        sheet.append(
-            [
-                meter.user.apartment,
-                meter.water_hot_bath or 0,
-                meter.water_cold_bath or 0,
-                meter.water_hot_kitchen or 0,
-                meter.water_cold_kitchen or 0,
-                (
-                    meter.created.strftime("%Y-%m-%d %H:%M")
-                    if meter.created
-                    else ""
-                ),
-            ]
-        )
-
-    for i in range(1, 7):
-        column_letter = get_column_letter(i)
-        length = len(str(sheet[column_letter][0].value))
-        sheet.column_dimensions[column_letter].width = min(length + 3, 50)
-        sheet[column_letter][0].alignment = Alignment(
-            horizontal="center", vertical="center"
-        )
-
-    virtual_workbook = BytesIO()
-    workbook.save(virtual_workbook)
-    virtual_workbook.seek(0)
-    return virtual_workbook
 
 
 async def generate_excel_energy_in_memory(
     session: AsyncSession,
-):
-    """Создаёт Excel-файл в памяти"""
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.append(
+    start: datetime.datetime,
+    end: datetime.datetime,
+) -> BytesIO:
+    """Создаёт Excel-файл в памяти, лист на каждый месяц"""
+    return await build_report(
         [
-            "Квартира",
-            "Т0",
-            "Т1",
-            "Т2",
-            "Дата списания",
+            ReportSheet(
+                "Электричество",
+                ENERGY_HEADER,
+                orm_stream_energy(session, start, end),
+                format_reading,
+                split=created_month,
+            )
         ]
     )
-    electric = await orm_get_all_energy_to_month(session)
-    for i, energy in enumerate(electric):
-        sheet.append(
-            [
-                energy.apartment,
-                energy.t0 or 0,
-                energy.t1 or 0,
-                energy.t2 or 0,
-                (
-                    energy.created.strftime("%Y-%m-%d %H:%M")
-                    if energy.created
-                    else ""
-                ),
-            ]
-        )
 
-    for i in range(1, 6):
-        column_letter = get_column_letter(i)
-        length = len(str(sheet[column_letter][0].value))
-        sheet.column_dimensions[column_letter].width = min(length + 3, 50)
-        sheet[column_letter][0].alignment = Alignment(
-            horizontal="center", vertical="center"
-        )
 
-    virtual_workbook = BytesIO()
-    workbook.save(virtual_workbook)
-    virtual_workbook.seek(0)
-    return virtual_workbook
+async def generate_excel_consumption_in_memory(
+    session: AsyncSession,
+    start: datetime.datetime,
+    end: datetime.datetime,
+) -> BytesIO:
+    """Создаёт Excel-файл расхода воды и электричества по месяцам"""
+    return await build_report(
+        [
+            ReportSheet(
+                "Вода",
+                WATER_HEADER,
+                orm_stream_meter_consumption(session, start, end),
+                format_consumption,
+                split=created_month,
+            ),
+            ReportSheet(
+                "Электричество",
+                ENERGY_HEADER,
+                orm_stream_energy_consumption(session, start, end),
+                format_consumption,
+                split=created_month,
+            ),
+        ]
+    )
 
 
-@user_private_admin_router.callback_query(F.data == "get_meter_month")
-async def get_meter_month(
-    callback: types.CallbackQuery,
-    bot: Bot,
-    session: AsyncSession,
+# отчёт: (название файла, источники данных, генератор, подпись)
+REPORTS = {
+    "meter": (
+        "Счетчики воды",
+        ("meter",),
+        generate_excel_in_memory,
+        "Ваш отчёт готов!",
+    ),
+    "power": (
+        "Счетчики электричества",
+        ("power",),
+        generate_excel_energy_in_memory,
+        "Ваш отчёт готов!",
+    ),
+    "consumption": (
+        "Расход",
+        ("meter", "power"),
+        generate_excel_consumption_in_memory,
+        "Ваш отчёт готов! Расход - разница с прошлым списанием.",
+    ),
+}
+REPORT_CALLBACKS = {
+    "get_meter_month": "meter",
+    "get_power_month": "power",
+    "get_consumption_month": "consumption",
+}
+
+
+async def send_report(
+    message: types.Message,
+    session_maker: async_sessionmaker,
+    name: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
 ):
+    """Отправляет отчёт за период, собранный заново или из кэша.
+
+    Сборку могут ждать несколько запросов, и она переживает отмену
+    первого из них, поэтому открывает свою сессию, а не берёт сессию
+    обновления.
+    """
+    title, sources, generate, caption = REPORTS[name]
+    period = format_period(start, end)
+
+    async def build() -> bytes:
+        async with session_maker() as session:
+            return (await generate(session, start, end)).getvalue()
+
+    report = await dbase.storage.reports.get((name, period), sources, build)
+    document = BufferedInputFile(file=report, filename=f"{title} {period}.xlsx")
+    await message.answer_document(document=document, caption=caption)
+
+
+@user_private_admin_router.callback_query(F.data.in_(REPORT_CALLBACKS))
+async def choose_report_period(callback: types.CallbackQuery):
     await callback.answer()
-    virtual_workbook = await generate_excel_in_memory(session)
-    filename = (
-        f"Счетчики воды на "
-        f"{datetime.datetime.now().strftime('%d-%m-%Y')}.xlsx"
-    )
-    document = BufferedInputFile(
-        file=virtual_workbook.getvalue(), filename=filename
-    )
-    await bot.send_document(
-        chat_id=callback.message.chat.id,
-        document=document,
-        caption="Ваш отчёт готов!",
+    name = REPORT_CALLBACKS[callback.data]
+    await callback.message.answer(
+        "Выберите период отчёта",
+        reply_markup=get_user_main_btns(
+            {
+                text: f"period:{name}:{kind}"
+                for text, kind in btns_period.items()
+            }
+        ),
     )
 
 
-@user_private_admin_router.callback_query(F.data == "get_power_month")
-async def get_power_month(
+@user_private_admin_router.callback_query(F.data.startswith("period:"))
+async def report_period_cmd(
     callback: types.CallbackQuery,
-    bot: Bot,
-    session: AsyncSession,
+    session_maker: async_sessionmaker,
+    state: FSMContext,
 ):
     await callback.answer()
-    virtual_workbook = await generate_excel_energy_in_memory(session)
-    filename = (
-        f"Счетчики электричества на "
-        f"{datetime.datetime.now().strftime('%d-%m-%Y')}.xlsx"
-    )
-    document = BufferedInputFile(
-        file=virtual_workbook.getvalue(), filename=filename
-    )
-    await bot.send_document(
-        chat_id=callback.message.chat.id,
-        document=document,
-        caption="Ваш отчёт готов!",
+    _, name, kind = callback.data.split(":")
+    if kind == "custom":
+        await state.set_state(ReportPeriod.period)
+        await state.update_data(report=name)
+        await callback.message.answer(
+            "Введите месяц ММ.ГГГГ или период ММ.ГГГГ-ММ.ГГГГ"
+        )
+        return
+    await send_report(
+        callback.message, session_maker, name, *current_period(kind)
     )
-    await start_cmd(message=callback.message, state=None, session=session)
+
+
+@user_private_admin_router.message(ReportPeriod.period, F.text)
+async def input_report_period(
+    message: types.Message,
+    session_maker: async_sessionmaker,
+    state: FSMContext,
+):
+    period = parse_period(message.text)
+    if period is None:
+        await message.answer(
+            "Неверный период. Пример: 01.2025 или 01.2025-12.2025"
+        )
+        return
+    if period_months(*period) > REPORT_MAX_MONTHS:
+        await message.answer(
+            f"Период не должен превышать {REPORT_MAX_MONTHS} месяцев."
+        )
+        return
+    data = await state.get_data()
+    await state.clear()
+    await send_report(message, session_maker, data["report"], *period)
+
+
+@user_private_admin_router.callback_query(F.data == "get_anomalies")
+async def get_anomalies_cmd(
+    callback: types.CallbackQuery, session: AsyncSession
+):
+    await callback.answer()
+    start, _ = month_bounds()
+    names = {kind: name for name, kind in btns.items()}
+    names.update({"t0": "Т0", "t1": "Т1", "t2": "Т2"})
+    anomalies = find_anomalies(
+        await orm_get_meter_history(session), start
+    ) + find_anomalies(await orm_get_power_history(session), start)
+    if not anomalies:
+        await callback.message.answer("Необычных показаний за месяц нет.")
+        return
+    lines = [f"⚠️ Необычные показания за месяц: {len(anomalies)}"]
+    for anomaly in sorted(anomalies, key=lambda a: (a.apartment or 0, a.kind)):
+        line = (
+            f"{anomaly.apartment} кв, {names.get(anomaly.kind, anomaly.kind)}: "
+            f"{anomaly.previous} → {anomaly.value} - {REASONS[anomaly.reason]}"
+        )
+        if anomaly.typical is not None:
+            line += f" (обычно {anomaly.typical:.0f} в месяц)"
+        lines.append(line)
+    text = ""
+    for line in lines:
+        if len(text) + len(line) + 1 > MESSAGE_LIMIT:
+            await callback.message.answer(text)
+            text = ""
+        text += line + "\n"
+    await callback.message.answer(text)
 
 
 @user_private_admin_router.callback_query(F.data == "post_power")
@@ -812,19 +1060,24 @@ async def input_t_power_cmd(
             await message.answer(
                 f"В доме {APARTMENTCOUNT} квартир. Введите номер существующей квартиры."
             )
-    elif current_state == GetPower.t0:
-        await state.update_data(t0=int(t))
-        await state.set_state(GetPower.t1)
-        await message.answer(f"{apartment} кв: Введите показания Т1")
-    elif current_state == GetPower.t1:
-        await state.update_data(t1=int(t))
-        await state.set_state(GetPower.t2)
-        await message.answer(f"{apartment} кв: Введите показания Т2")
-    elif current_state == GetPower.t2:
-        await state.update_data(t2=int(t))
+    elif current_state in (GetPower.t0, GetPower.t1, GetPower.t2):
+        tariff = current_state.split(":")[-1]
+        points = await orm_get_power_points(session, apartment, tariff)
+        if not await confirm_anomaly(message, state, points, tariff, int(t)):
+            return
+        await state.update_data({tariff: int(t)})
+        if current_state == GetPower.t0:
+            await state.set_state(GetPower.t1)
+            await message.answer(f"{apartment} кв: Введите показания Т1")
+            return
+        if current_state == GetPower.t1:
+            await state.set_state(GetPower.t2)
+            await message.answer(f"{apartment} кв: Введите показания Т2")
+            return
         data = await state.get_data()
-        apartment = data.get("apartment")
-        result = await orm_add_update_power(session, **data)
+        result = await orm_add_update_power(
+            session, apartment, data["t0"], data["t1"], data["t2"]
+        )
         if result:
             await message.answer(
                 f"Показания {apartment} кв сохранены успешно. \nТ0 - {data.get('t0')}\nТ1 - {data.get('t1')}\nТ2 - {data.get('t2')}"
@@ -856,7 +1109,58 @@ async def next_apartment(callback: types.CallbackQuery, state: FSMContext):
         await callback.message.answer("Готово!")
         await state.clear()
 
-    print("apartment==", apartment)
+
+@user_private_admin_router.callback_query(F.data == "import_power")
+async def import_power_cmd(callback: types.CallbackQuery, state: FSMContext):
+    await callback.answer()
+    await state.set_state(ImportPower.data)
+    await callback.message.answer(
+        "Отправьте файл .xlsx или .csv со столбцами: квартира, Т0, Т1, Т2.\n"
+        "Можно вставить текст: каждая строка - квартира Т0 Т1 Т2."
+    )
+
+
+@user_private_admin_router.message(ImportPower.data, F.document | F.text)
+async def input_power_file_cmd(
+    message: types.Message, session: AsyncSession, state: FSMContext
+):
+    document = message.document
+    if document is None:
+        rows = rows_from_text(message.text)
+    elif document.file_size and document.file_size > IMPORT_MAX_SIZE:
+        await message.answer("Файл слишком большой.")
+        return
+    else:
+        data = (await message.bot.download(document)).getvalue()
+        name = (document.file_name or "").lower()
+        try:
+            if name.endswith(".xlsx"):
+                rows = await asyncio.to_thread(rows_from_xlsx, data)
+            elif name.endswith(".csv"):
+                rows = rows_from_csv(data.decode("utf-8-sig"))
+            else:
+                await message.answer("Нужен файл .xlsx или .csv")
+                return
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать файл показаний: {e}")
+            await message.answer("Не удалось прочитать файл.")
+            return
+
+    result = validate_power_rows(rows, await orm_get_last_power(session))
+    saved = await orm_add_update_powers(session, result.accepted)
+    await state.clear()
+    lines = [
+        f"✅ Принято: {saved}",
+        f"⚠️ Отклонено: {len(result.rejected)}",
+        *(f"строка {line}: {reason}" for line, reason in result.rejected),
+    ]
+    text = ""
+    for line in lines:
+        if len(text) + len(line) + 1 > MESSAGE_LIMIT:
+            await message.answer(text)
+            text = ""
+        text += line + "\n"
+    await message.answer(text)
 
 
 @user_private_admin_router.callback_query(F.data)
@@ -876,7 +1180,7 @@ async def set_meter_cmd(
         "water_cold_bath": ChangeMeter.water_cold_bath,
     }
     data = await state.get_data()
-    user = await orm_get_user_apartment(session, data["apartment"])
+    user = dbase.storage.residents.get_by_apartment(data["apartment"])
     meter = await orm_get_user_meters_last(session, user.tele_id)
     current_value = None
     name_meter = ""
@@ -923,7 +1227,7 @@ async def save_meter_cmd(
         await state.clear()
         return
 
-    user = await orm_get_user_apartment(session, apartment)
+    user = dbase.storage.residents.get_by_apartment(apartment)
     if not user:
         await message.answer("Пользователь не найден.")
         await state.clear()
@@ -960,6 +1264,12 @@ async def save_meter_cmd(
     )
     if not validate:
         return
+    kind = current_state.split(":")[-1]
+    points = await orm_get_meter_points(session, user.tele_id, kind)
+    if not await confirm_anomaly(
+        message, state, points, kind, int(message.text)
+    ):
+        return
 
     await orm_add_update_meter(
         session,
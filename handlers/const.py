@@ -7,3 +7,11 @@ PORCH_APART = {
     5: (303, 386),
 }
 NUMBER_TSJ = 301
+ADMIN_CACHE_TTL = 600  # секунд между запросами админов чата у Telegram
+ADMIN_REFRESH_INTERVAL = 600  # секунд между сверками админов групп с БД
+MESSAGE_LIMIT = 4096  # максимальная длина сообщения Telegram
+METER_LOG_LIMIT = 100  # записей в истории подачи показаний квартиры
+REPORT_MAX_MONTHS = 120  # отчёт не больше чем за 10 лет
+IMPORT_MAX_SIZE = 1024 * 1024  # байт в файле загрузки показаний
+MAX_EXPIRY_SLEEP = 3600  # секунд: сверка сроков блокировок с часами
+EXPIRY_RETRY_INTERVAL = 60  # секунд до повтора после ошибки БД
@@ -50,3 +50,11 @@ class GetPower(StatesGroup):
     t1 = State()
     t2 = State()
     next_ap = State()
+
+
+class ImportPower(StatesGroup):
+    data = State()
+
+
+class ReportPeriod(StatesGroup):
+    period = State()
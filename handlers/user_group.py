@@ -1,6 +1,4 @@
 import asyncio
-from datetime import datetime, timezone
-from string import punctuation
 
 from aiogram import Bot, Router, types
 from aiogram.filters import Command
@@ -8,68 +6,120 @@ from aiogram.types import ChatMemberUpdated
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import dbase.storage
+from common.outbox import OutboxDispatcher, OutboxMessage
 from dbase.orm_query import (
     post_block_user,
     orm_add_admins,
-    get_block_users,
-    remove_block_user,
+    orm_delete_expired_bans,
 )
+from dbase.ban_index import utc_now
 from filters.chat_types import ChatTypeFilter
+from handlers.const import (
+    ADMIN_REFRESH_INTERVAL,
+    EXPIRY_RETRY_INTERVAL,
+    MAX_EXPIRY_SLEEP,
+)
 from handlers.admin_private import logger
 from kbds.kbds import get_user_main_btns
 
-user_group_router = Router()
+user_group_router = Router(name="user_group_router")
 user_group_router.message.filter(ChatTypeFilter(["group", "supergroup"]))
 
 
-async def cleanup_expired_bans(
-    session_maker, bot: Bot, interval: int = 60
-) -> None:
+async def expire_bans(session_maker, outbox: OutboxDispatcher) -> None:
+    """Снимает блокировки точно в срок.
+
+    Спит до ближайшего unblock_time из индекса блокировок; новая
+    блокировка с более ранним сроком будит задачу раньше.
+    """
+    bans = dbase.storage.ban_index
     while True:
+        bans.expiry_changed.clear()
+        deadline = bans.next_expiry()
+        timeout = MAX_EXPIRY_SLEEP
+        if deadline is not None:
+            timeout = min(
+                timeout, max(0.0, (deadline - utc_now()).total_seconds())
+            )
+        try:
+            await asyncio.wait_for(bans.expiry_changed.wait(), timeout)
+            continue
+        except asyncio.TimeoutError:
+            pass
+        now = utc_now()
+        deadline = bans.next_expiry()
+        if deadline is None or deadline > now:
+            continue
         try:
             async with session_maker() as session:
-                ban_users = await get_block_users(session)
-                now = datetime.now(timezone.utc)
-                for ban in ban_users:
-                    unblock = getattr(ban, "unblock_time", None)
-                    if unblock:
-                        if unblock.tzinfo is None:
-                            unblock = unblock.replace(tzinfo=timezone.utc)
-                        if unblock <= now:
-                            await remove_block_user(session, ban.user_tele_id)
-                            try:
-                                await bot.send_message(
-                                    chat_id=ban.user_tele_id,
-                                    text="Срок вашей блокировки в чате истёк — вы разблокированы.",
-                                )
-                            except Exception as e1:
-                                logger.error(
-                                    f"Ошибка отправки сообщения заблокированному юзеру: {e1}/ user {ban.user_tele_id}"
-                                )
+                expired = await orm_delete_expired_bans(session, now)
+                # записи, удалённые не этим процессом, убираем из индекса
+                for ban_id in bans.pop_due(now):
+                    bans.discard(ban_id)
+                await outbox.enqueue(
+                    session,
+                    [
+                        OutboxMessage(
+                            f"unban:{ban_id}",
+                            tele_id,
+                            "Срок вашей блокировки в чате истёк"
+                            " — вы разблокированы.",
+                        )
+                        for ban_id, tele_id in expired
+                    ],
+                )
         except Exception as e:
-            logger.error(f"cleanup_expired_bans error: {e}")
-        await asyncio.sleep(interval)
+            logger.error(f"expire_bans error: {e}")
+            await asyncio.sleep(EXPIRY_RETRY_INTERVAL)
+
 
+async def save_admins(session: AsyncSession) -> None:
+    """Записывает в БД полный список админов групп GROUP_CHAT_IDS.
 
-def clean_text(text: str):
-    return text.translate(str.maketrans("", "", punctuation))
+    Выбывшие теряют права, поэтому список пишется только когда получены
+    админы всех групп. Пустой список не записывается, чтобы сбой
+    Telegram не снял права со всех.
+    """
+    admins = dbase.storage.chat_admins.admin_names()
+    if admins:
+        await orm_add_admins(session, admins)
+
+
+async def refresh_admins(bot: Bot, session_maker) -> None:
+    """Раз в ADMIN_REFRESH_INTERVAL сверяет админов групп с Telegram.
+
+    Сверяются только группы GROUP_CHAT_IDS; если админов хотя бы одной
+    получить не удалось, список в БД не меняется до следующей сверки.
+    """
+    chat_admins = dbase.storage.chat_admins
+    while True:
+        fetched = True
+        for chat_id in chat_admins.groups:
+            try:
+                await chat_admins.get(bot, chat_id, refresh=True)
+            except Exception as e:
+                fetched = False
+                logger.error(f"Не удалось получить админов чата {chat_id}: {e}")
+        if fetched:
+            try:
+                async with session_maker() as session:
+                    await save_admins(session)
+            except Exception as e:
+                logger.error(f"refresh_admins error: {e}")
+        await asyncio.sleep(ADMIN_REFRESH_INTERVAL)
 
 
 @user_group_router.message(Command("admin"))
 async def get_admin(message: types.Message, bot: Bot, session: AsyncSession):
     chat_id = message.chat.id
     try:
-        chat_admins = await bot.get_chat_administrators(chat_id)
-        admin_tele_ids = [
-            admin.user.id
-            for admin in chat_admins
-            if admin.status in ("creator", "administrator")
-            and not admin.user.is_bot
-        ]
-        await orm_add_admins(session, admin_tele_ids, chat_id, bot)
-        bot.my_admin_list = admin_tele_ids
-
-        if message.from_user.id in admin_tele_ids:
+        chat_admins = await dbase.storage.chat_admins.get(
+            bot, chat_id, refresh=True
+        )
+        if dbase.storage.chat_admins.is_group(chat_id):
+            await save_admins(session)
+
+        if message.from_user.id in chat_admins:
             await message.delete()
 
     except Exception as e:
@@ -77,23 +127,11 @@ async def get_admin(message: types.Message, bot: Bot, session: AsyncSession):
         await message.answer("Не удалось обновить список админов.")
 
 
-# TODO обновить место получения админов
-
-
-async def delete_if_blocked(
-    message: types.Message, session: AsyncSession
-) -> bool:
-    try:
-        ban_users = await get_block_users(session)
-        banned_tele_ids = {ban.user_tele_id for ban in ban_users}
-    except Exception as e:
-        logger.error(f"Ошибка получения списка заблокированных: {e}")
-        return False
-
+async def delete_if_blocked(message: types.Message) -> bool:
     if not message.from_user:
         return False
 
-    if message.from_user.id in banned_tele_ids:
+    if dbase.storage.ban_index.is_banned(message.from_user.id):
         try:
             await message.delete()
             await message.bot.send_message(
@@ -118,19 +156,17 @@ async def cleaner(message: types.Message, bot: Bot, session: AsyncSession):
     if not message.text:
         return
 
-    if await delete_if_blocked(message, session):
+    if await delete_if_blocked(message):
         return
 
-    if dbase.storage.restricted_words.intersection(
-        clean_text(message.text.lower()).split()
-    ):
-        admins = await bot.get_chat_administrators(message.chat.id)
+    if dbase.storage.restricted_words.search(message.text):
+        creator = await dbase.storage.chat_admins.get_creator(
+            bot, message.chat.id
+        )
         creator_id, creator_name = None, None
-        for admin in admins:
-            if admin.status == "creator":
-                creator_id = admin.user.id
-                creator_name = admin.user.username
-                break
+        if creator:
+            creator_id = creator.user.id
+            creator_name = creator.user.username
 
         await message.answer(
             f"{message.from_user.first_name}, соблюдайте порядок в чате!"
@@ -167,13 +203,17 @@ async def cleaner(message: types.Message, bot: Bot, session: AsyncSession):
 async def on_user_added(
     event: ChatMemberUpdated, bot: Bot, session: AsyncSession
 ):
+    if dbase.storage.chat_admins.update_member(
+        event.chat.id, event.new_chat_member
+    ) and dbase.storage.chat_admins.is_group(event.chat.id):
+        await save_admins(session)
     user = event.new_chat_member.user
-    ban_users = await get_block_users(session)
-    banned_tele_ids = {ban.user_tele_id for ban in ban_users}
+    is_banned = dbase.storage.ban_index.is_banned(user.id)
     logger.info(
-        f"Проверка входящего  {user.full_name} (ID: {user.id}) в {ban_users}"
+        f"Проверка входящего  {user.full_name} (ID: {user.id}),"
+        f" заблокирован: {is_banned}"
     )
-    if (not user.is_bot) or (user.id in banned_tele_ids):
+    if (not user.is_bot) or is_banned:
 
         if event.new_chat_member.status not in {"left", "kicked", "restricted"}:
             text = f"Добро пожаловать, {user.full_name}"
@@ -1,3 +1,5 @@
+import logging
+
 from aiogram import F, Router, types, Bot
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
@@ -9,7 +11,9 @@ from handlers.const import APARTMENTCOUNT
 from handlers.states import AddUser
 from kbds.kbds import get_user_main_btns
 
-user_private_router = Router()
+logger = logging.getLogger(__name__)
+
+user_private_router = Router(name="user_private_router")
 user_private_router.message.filter(ChatTypeFilter(["private"]))
 
 
@@ -186,9 +190,9 @@ async def cancel_cmd(callback_query: types.CallbackQuery, state: FSMContext):
 
 @user_private_router.callback_query()
 async def debug_all_callbacks(callback_query: types.CallbackQuery):
-    print(
-        f"Получен callback_data в user_private_router:'"
-        f"{callback_query.data}"
+    logger.warning(
+        f"Необработанный callback_data в user_private_router: "
+        f"{callback_query.data!r}"
     )
     await callback_query.answer(
         "Обработка не найдена для: " + callback_query.data
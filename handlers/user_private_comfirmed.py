@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime
 
 from aiogram import F, Router, types
@@ -9,15 +10,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from dbase.orm_query import (
     orm_add_update_meter,
     orm_get_meter_from_user_month_year,
+    orm_get_meter_points,
     orm_get_user_meters_last,
     orm_get_user_tele,
 )
 from filters.chat_types import ChatTypeFilter, IsConfirmedUser
-from filters.data_filter import validate_data_meter
+from filters.data_filter import confirm_anomaly, validate_data_meter
 from handlers.states import AddMeter
 from kbds.kbds import btns, get_user_main_btns
 
-user_private_confirmed_router = Router()
+logger = logging.getLogger(__name__)
+
+user_private_confirmed_router = Router(name="user_private_confirmed_router")
 user_private_confirmed_router.message.filter(
     ChatTypeFilter(["private"]), IsConfirmedUser()
 )
@@ -142,7 +146,6 @@ async def save_meter_cmd(
         session, message.from_user.id
     )
     current_state = await state.get_state()
-    print("current_state==", current_state)
     meter_value = None
     if current_state == AddMeter.water_hot_kitchen:
         meter_value = meter.water_hot_kitchen if meter else None
@@ -159,9 +162,17 @@ async def save_meter_cmd(
     validate = await validate_data_meter(
         message, state, message.text, meter_value
     )
-    print("validate==", validate, "meter_value==", meter_value)
+    logger.debug(
+        f"{current_state}: validate={validate}, meter_value={meter_value}"
+    )
     if not validate or current_state is None:
         return
+    kind = current_state.split(":")[-1]
+    points = await orm_get_meter_points(session, message.from_user.id, kind)
+    if not await confirm_anomaly(
+        message, state, points, kind, int(message.text)
+    ):
+        return
     await orm_add_update_meter(
         session,
         message.from_user.id,
@@ -188,8 +199,9 @@ async def cancel_handler(message: types.Message, state: FSMContext) -> None:
 
 @user_private_confirmed_router.callback_query()
 async def debug_all_callbacks(callback_query: types.CallbackQuery):
-    print(
-        f"Получен user_private_confirmed_router callback_data: '{callback_query.data}'"
+    logger.warning(
+        f"Необработанный callback_data в user_private_confirmed_router: "
+        f"{callback_query.data!r}"
     )
     await callback_query.answer(
         "Обработка не найдена для: " + callback_query.data
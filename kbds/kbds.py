@@ -33,10 +33,21 @@ btns_admin = {
     "🤬 Ругательства": "restrict_words",
     "💧 Запросить показания воды": "get_meter_all",
     "⚡ Списания электро счётчиков": "post_power",
+    "📥 Электро из файла": "import_power",
     "💧 Отчет по воде": "get_meter_month",
+    "📊 Расход за месяц": "get_consumption_month",
+    "⚠️ Аномалии показаний": "get_anomalies",
     "⚡ Отчет по электро": "get_power_month",
 }
 
+btns_period = {
+    "Текущий месяц": "month",
+    "Прошлый месяц": "prev",
+    "Квартал": "quarter",
+    "Год": "year",
+    "Другой период": "custom",
+}
+
 btns_del_confirm = {"Подтвердить": "conf_user", "Удалить": "del_user"}
 
 btns_yes_no = {"Да": "yes", "Отмена": "cancel"}
@@ -1,13 +1,43 @@
-from typing import Any, Awaitable, Callable, Dict
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+class LazySession:
+    """Сессия БД, которая открывается при первом обращении.
+
+    Все атрибуты проксируются в AsyncSession, созданную из пула
+    при первом вызове (execute, add, get, ...).
+    """
+
+    def __init__(self, session_pool: async_sessionmaker) -> None:
+        self._session_pool = session_pool
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._session_pool()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
 
 
 class DataBaseSession(BaseMiddleware):
     def __init__(self, session_pool: async_sessionmaker):
         self.session_pool = session_pool
+        self.updates = 0
+        self.sessions = 0
 
     async def __call__(
         self,
@@ -15,6 +45,17 @@ class DataBaseSession(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.session_pool() as session:
-            data["session"] = session
+        session = LazySession(self.session_pool)
+        data["session"] = session
+        try:
             return await handler(event, data)
+        finally:
+            await session.close()
+            self.updates += 1
+            self.sessions += session.used
+            logger.debug(
+                "Сессия БД использована: %s, сессий %s на %s обновлений",
+                session.used,
+                self.sessions,
+                self.updates,
+            )
@@ -0,0 +1,75 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject
+
+from common.metrics import (
+    handler_errors,
+    handler_seconds,
+    telegram_errors,
+    telegram_seconds,
+)
+
+# события, обработчики которых есть в роутерах бота
+OBSERVED_EVENTS = ("message", "edited_message", "callback_query", "chat_member")
+
+
+class HandlerMetrics(BaseMiddleware):
+    """Время и исключения обработчиков по роутеру и имени функции.
+
+    Регистрируется внутренним middleware диспетчера и поэтому
+    срабатывает для обработчиков всех вложенных роутеров.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        router = data.get("event_router")
+        handler_object = data.get("handler")
+        labels = (
+            router.name if router else "",
+            handler_object.callback.__name__ if handler_object else "",
+        )
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.inc(*labels, type(e).__name__)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, *labels)
+
+
+class TelegramMetrics(BaseRequestMiddleware):
+    """Время и ошибки запросов к Bot API по методу."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        name = method.__api_method__
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            telegram_seconds.observe(time.perf_counter() - start, name)
+
+
+def setup_metrics(dispatcher: Dispatcher, bot: Bot) -> None:
+    for name in OBSERVED_EVENTS:
+        dispatcher.observers[name].middleware(HandlerMetrics())
+    bot.session.middleware(TelegramMetrics())
@@ -1,63 +1,239 @@
 import asyncio
-import logging
+import multiprocessing
 import os
-from logging.handlers import RotatingFileHandler
+import signal
+from functools import partial
+from typing import Sequence
 
 from aiogram import Bot, Dispatcher, types
 from dotenv import load_dotenv
 
 import dbase.storage
-from dbase.orm_query import orm_get_words
+from dbase.orm_query import (
+    get_all_block_records,
+    orm_get_admin_list,
+    orm_get_all_users,
+    orm_get_words,
+)
 
 load_dotenv()
 
 from common.bot_cmds_list import private
+from common.broadcast import Broadcaster
+from common.logging_setup import parse_levels, setup_logging
+from common.metrics import serve_metrics
+from common.outbox import OutboxDispatcher
+from common.webhook import DRAIN_TIMEOUT, HANDLERS, QUEUE_SIZE, WebhookServer
+from dbase.change_feed import POLL_INTERVAL, ChangeFeed
+from dbase.fsm_storage import FLUSH_INTERVAL, SQLStorage
 from dbase.orm_db import create_db, session_maker
-from handlers.admin_private import user_private_admin_router
-from handlers.user_group import user_group_router, cleanup_expired_bans
+from handlers.admin_private import (
+    del_blocked_users,
+    user_private_admin_router,
+)
+from handlers.user_group import user_group_router, expire_bans, refresh_admins
 from handlers.user_private import user_private_router
 from handlers.user_private_comfirmed import user_private_confirmed_router
 from middlewares.db import DataBaseSession
+from middlewares.metrics import setup_metrics
 
+LOG_FILE = os.getenv("LOG_FILE", "log_read_meter_telebot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "ERROR")
+# уровни отдельных модулей: "aiogram.event=INFO,dbase=DEBUG"
+LOG_LEVELS = parse_levels(os.getenv("LOG_LEVELS", ""))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", "50000000"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
 
-log_formatter = logging.Formatter(
-    "%(asctime)s, %(levelname)s, %(message)s /%(funcName)s/"
-)
-log_handler = RotatingFileHandler(
-    "log_read_meter_telebot.log",
-    maxBytes=50_000_000,
-    backupCount=5,
-    encoding="utf-8",
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling или webhook
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # внешний адрес, https://...
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# процессы слушают порты WEBHOOK_PORT, WEBHOOK_PORT + 1, ... за прокси
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", QUEUE_SIZE))
+WEBHOOK_HANDLERS = int(os.getenv("WEBHOOK_HANDLERS", HANDLERS))
+# секунд на остановку: обработку очереди и сброс FSM
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", DRAIN_TIMEOUT))
+# секунд ожидания остановки воркеров после SIGTERM, затем SIGKILL
+WORKER_STOP_TIMEOUT = WEBHOOK_DRAIN_TIMEOUT + 10
+# группы, админы которых получают права в боте, через запятую;
+# обязательно
+GROUP_CHAT_IDS = [
+    int(chat_id)
+    for chat_id in os.getenv("GROUP_CHAT_IDS", "").split(",")
+    if chat_id.strip()
+]
+# FSM: сколько секунд состояние берётся из памяти без чтения БД и как
+# часто изменения пишутся в БД; при нескольких процессах по умолчанию
+# состояние читается из БД и записывается сразу
+FSM_CACHE_TTL = os.getenv("FSM_CACHE_TTL", "" if WEBHOOK_WORKERS == 1 else "0")
+FSM_FLUSH_INTERVAL = float(
+    os.getenv(
+        "FSM_FLUSH_INTERVAL", FLUSH_INTERVAL if WEBHOOK_WORKERS == 1 else 0
+    )
 )
-log_handler.setFormatter(log_formatter)
-
-logging.getLogger().setLevel(logging.ERROR)
-logging.getLogger().addHandler(log_handler)
+# как часто процесс читает изменения слов, блокировок и жильцов,
+# сделанные другими процессами
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", POLL_INTERVAL))
+# /metrics для Prometheus; 0 - не запускать. Воркер N слушает
+# METRICS_PORT + N
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
 bot = Bot(token=os.getenv("TELEGRAM_TOKEN"))
-bot.my_admin_list = []
-dp = Dispatcher()
+dp = Dispatcher(
+    storage=SQLStorage(
+        session_maker,
+        flush_interval=FSM_FLUSH_INTERVAL,
+        cache_ttl=float(FSM_CACHE_TTL) if FSM_CACHE_TTL else None,
+    )
+)
+dp["session_maker"] = session_maker  # для задач, переживающих обновление
+dp["broadcaster"] = Broadcaster(bot)
+dp["outbox"] = OutboxDispatcher(
+    session_maker,
+    dp["broadcaster"],
+    on_done=partial(del_blocked_users, bot),
+)
+change_feed = ChangeFeed(session_maker, interval=CHANGE_POLL_INTERVAL)
 
 dp.include_router(user_private_admin_router)
 dp.include_router(user_private_confirmed_router)
 dp.include_router(user_private_router)
 dp.include_router(user_group_router)
+setup_metrics(dp, bot)
 
 
-async def main():
+async def setup(background: bool = True):
+    """Общий запуск: middleware, команды, индексы в памяти.
+
+    background - запустить фоновые задачи (outbox, снятие блокировок,
+    сверка админов, чистка журнала изменений);
+    при нескольких процессах они работают только в первом.
+    """
+    if not GROUP_CHAT_IDS:
+        raise RuntimeError("Не задан GROUP_CHAT_IDS - группы с админами бота")
     dp.update.middleware(DataBaseSession(session_pool=session_maker))
-    await bot.delete_webhook(drop_pending_updates=True)
     await bot.set_my_commands(
         commands=private, scope=types.BotCommandScopeAllPrivateChats()
     )
     async with session_maker() as session:
-        words = set(await orm_get_words(session))
-        dbase.storage.restricted_words = set(word.lower() for word in words)
+        # изменения во время загрузки применятся повторно - это безопасно
+        await change_feed.start(session)
+        dbase.storage.restricted_words.load(await orm_get_words(session))
+        dbase.storage.ban_index.load(await get_all_block_records(session))
+        dbase.storage.residents.load(await orm_get_all_users(session))
+        dbase.storage.chat_admins.set_groups(GROUP_CHAT_IDS)
+        dbase.storage.chat_admins.set_roster(
+            user.tele_id for user in await orm_get_admin_list(session)
+        )
+
+    asyncio.create_task(change_feed.run(prune=background))
+    if background:
+        asyncio.create_task(dp["outbox"].run())
+        asyncio.create_task(expire_bans(session_maker, dp["outbox"]))
+        asyncio.create_task(refresh_admins(bot, session_maker))
+
+
+async def start_metrics(worker: int = 0):
+    if METRICS_PORT:
+        await serve_metrics(METRICS_HOST, METRICS_PORT + worker)
 
-    asyncio.create_task(cleanup_expired_bans(session_maker, bot, interval=60))
+
+async def main():
+    await setup()
+    await start_metrics()
+    await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
 
+async def main_webhook(worker: int = 0, children: Sequence = ()):
+    """children - процессы воркеров; сигнал остановки пересылается им."""
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("Для режима webhook нужен WEBHOOK_SECRET")
+    await setup(background=worker == 0)
+    await start_metrics(worker)
+    if worker == 0:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    server = WebhookServer(
+        bot,
+        dp,
+        WEBHOOK_SECRET,
+        WEBHOOK_PATH,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+        handlers=WEBHOOK_HANDLERS,
+        drain_timeout=WEBHOOK_DRAIN_TIMEOUT,
+    )
+
+    # SIGTERM от systemd/docker или родителя: принять уже полученное,
+    # дообработать очередь и сбросить FSM вместо обрыва
+    def stop():
+        server.stop()
+        for process in children:
+            process.terminate()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop)
+    try:
+        await server.serve(WEBHOOK_HOST, WEBHOOK_PORT + worker)
+    finally:
+        await dp.emit_shutdown(bot=bot)  # сбрасывает FSM в БД
+        await bot.session.close()
+
+
+def start_logging(worker: int = 0):
+    """Лог в файл через очередь; у каждого процесса свой файл."""
+    filename = LOG_FILE
+    if worker:
+        stem, ext = os.path.splitext(LOG_FILE)
+        filename = f"{stem}-{worker}{ext}"
+    return setup_logging(
+        filename,
+        level=LOG_LEVEL,
+        levels=LOG_LEVELS,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+    )
+
+
+def run_webhook_worker(worker: int):
+    listener = start_logging(worker)
+    try:
+        asyncio.run(main_webhook(worker))
+    finally:
+        listener.stop()
+
+
 if __name__ == "__main__":
-    asyncio.run(create_db())
-    asyncio.run(main())
+    listener = start_logging()
+    try:
+        asyncio.run(create_db())
+        if BOT_MODE == "webhook":
+            context = multiprocessing.get_context("spawn")
+            workers = [
+                context.Process(target=run_webhook_worker, args=(worker,))
+                for worker in range(1, WEBHOOK_WORKERS)
+            ]
+            for process in workers:
+                process.start()
+            try:
+                asyncio.run(main_webhook(0, workers))
+            finally:
+                # terminate() шлёт SIGTERM: воркеры останавливаются сами
+                for process in workers:
+                    process.terminate()
+                for process in workers:
+                    process.join(WORKER_STOP_TIMEOUT)
+                    if process.is_alive():
+                        process.kill()
+        else:
+            asyncio.run(main())
+    finally:
+        listener.stop()  # дописывает очередь лога
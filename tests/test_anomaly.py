@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from common.anomaly import check_value, find_anomalies, typical_consumption
+
+
+def _history(*values):
+    return [(datetime(2026, month, 20), value) for month, value in values]
+
+
+HISTORY = _history((1, 100), (2, 105), (3, 110), (4, 115))
+
+
+def test_typical_consumption_needs_enough_history():
+    assert typical_consumption(HISTORY[:3]) is None
+    assert typical_consumption(HISTORY) == 5
+
+
+def test_typical_consumption_is_per_month_across_gaps():
+    history = _history((1, 100), (3, 110), (4, 115), (5, 120))
+    assert typical_consumption(history) == 5
+
+
+def test_normal_value_passes():
+    assert check_value(HISTORY, datetime(2026, 5, 20), 121) == (None, 5)
+
+
+def test_regression_is_found_even_without_history():
+    reason, _ = check_value(HISTORY[:1], datetime(2026, 2, 20), 90)
+    assert reason == "regression"
+
+
+def test_spike_needs_both_factor_and_minimum():
+    assert check_value(HISTORY, datetime(2026, 5, 20), 135)[0] == "spike"
+    # в 3 раза больше обычного, но меньше MIN_SPIKE
+    small = _history((1, 0), (2, 1), (3, 2), (4, 3))
+    assert check_value(small, datetime(2026, 5, 20), 9)[0] is None
+
+
+def test_zero_consumption_is_flagged():
+    assert check_value(HISTORY, datetime(2026, 5, 20), 115)[0] == "zero"
+
+
+def test_find_anomalies_reports_only_since():
+    rows = [
+        (1, created, {"cold": value, "hot": None})
+        for created, value in HISTORY + _history((5, 200))
+    ] + [(2, datetime(2026, 5, 20), {"cold": 7})]
+    anomalies = find_anomalies(rows, since=datetime(2026, 5, 1))
+    assert [
+        (a.apartment, a.kind, a.value, a.previous, a.reason) for a in anomalies
+    ] == [(1, "cold", 200, 115, "spike")]
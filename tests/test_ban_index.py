@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from dbase.ban_index import BanIndex
+
+NOW = datetime(2026, 1, 1, 12)
+
+
+def _at(minutes: int) -> datetime:
+    return NOW + timedelta(minutes=minutes)
+
+
+def test_next_expiry_is_the_earliest_confirmed_ban():
+    bans = BanIndex()
+    bans.add(1, 100, 5, confirmed=True, unblock_time=_at(30))
+    bans.add(2, 200, 5, confirmed=True, unblock_time=_at(10))
+    bans.add(3, 300, 5, confirmed=False, unblock_time=_at(1))
+    assert bans.next_expiry() == _at(10)
+
+
+def test_earlier_ban_wakes_the_expiry_task():
+    bans = BanIndex()
+    bans.add(1, 100, 5, confirmed=True, unblock_time=_at(30))
+    bans.expiry_changed.clear()
+    bans.add(2, 200, 5, confirmed=True, unblock_time=_at(60))
+    assert not bans.expiry_changed.is_set()
+    bans.add(3, 300, 5, confirmed=True, unblock_time=_at(10))
+    assert bans.expiry_changed.is_set()
+
+
+def test_stale_heap_entries_are_skipped():
+    bans = BanIndex()
+    bans.add(1, 100, 5, confirmed=True, unblock_time=_at(10))
+    bans.add(2, 200, 5, confirmed=True, unblock_time=_at(20))
+    bans.set_confirmed(1, True, unblock_time=_at(40))  # срок продлён
+    bans.discard(2)
+    assert bans.next_expiry() == _at(40)
+    assert bans.pop_due(_at(30)) == []
+    assert bans.pop_due(_at(40)) == [1]
+    assert bans.next_expiry() is None
+
+
+def test_aware_times_are_compared_in_utc():
+    bans = BanIndex()
+    moscow = timezone(timedelta(hours=3))
+    bans.add(
+        1,
+        100,
+        5,
+        confirmed=True,
+        unblock_time=_at(0).replace(tzinfo=timezone.utc).astimezone(moscow),
+    )
+    assert bans.next_expiry() == NOW
+
+
+def test_user_stays_banned_while_any_confirmed_ban_remains():
+    bans = BanIndex()
+    bans.add(1, 100, 5, confirmed=True)
+    bans.add(2, 100, 6, confirmed=True, unblock_time=_at(10))
+    bans.discard(2)
+    assert bans.is_banned(100)
+    assert bans.get_chat_banned(5) == {100}
+    bans.discard_user(100)
+    assert not bans.is_banned(100)
+    assert bans.get_chat_banned(5) == set()
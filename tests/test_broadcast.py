@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+
+from common import broadcast
+from common.broadcast import Broadcaster, OutgoingMessage
+
+
+class FakeBot:
+    def __init__(self, errors=None, delay=0.0):
+        self.errors = errors or {}  # chat_id -> исключения по очереди
+        self.delay = delay
+        self.sent: list[tuple[int, float]] = []
+        self.active = self.peak = 0
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            errors = self.errors.get(chat_id)
+            if errors:
+                raise errors.pop(0)
+            self.sent.append((chat_id, time.monotonic()))
+        finally:
+            self.active -= 1
+
+
+def _retry_after(seconds=0):
+    return TelegramRetryAfter(None, "flood", retry_after=seconds)
+
+
+def test_pool_limits_concurrent_sends():
+    bot = FakeBot(delay=0.01)
+    broadcaster = Broadcaster(bot, rate=1000, chat_interval=0, workers=4)
+    messages = [OutgoingMessage(chat_id, "hi") for chat_id in range(20)]
+    statuses = asyncio.run(broadcaster.send(messages))
+    assert statuses == ["sent"] * 20
+    assert bot.peak == 4
+
+
+def test_retry_after_does_not_count_against_retries():
+    bot = FakeBot(errors={1: [_retry_after() for _ in range(5)]})
+    broadcaster = Broadcaster(bot, rate=1000, chat_interval=0)
+    status = asyncio.run(broadcaster.send_one(OutgoingMessage(1, "hi")))
+    assert status == "sent"
+
+
+def test_network_errors_give_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(broadcast, "RETRY_DELAY", 0)
+    errors = [TelegramNetworkError(None, "down") for _ in range(5)]
+    bot = FakeBot(errors={1: errors})
+    broadcaster = Broadcaster(bot, rate=1000, chat_interval=0)
+    status = asyncio.run(broadcaster.send_one(OutgoingMessage(1, "hi")))
+    assert status == "failed"
+    assert len(errors) == 5 - broadcast.MAX_RETRIES
+
+
+def test_concurrent_sends_to_one_chat_are_spaced():
+    bot = FakeBot()
+    broadcaster = Broadcaster(bot, rate=1000, chat_interval=0.05)
+    messages = [OutgoingMessage(1, str(i)) for i in range(3)]
+    asyncio.run(broadcaster.send(messages))
+    times = [moment for _, moment in bot.sent]
+    assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+
+
+def test_chat_timestamps_are_pruned(monkeypatch):
+    monkeypatch.setattr(broadcast, "CHAT_TRACK_LIMIT", 10)
+    broadcaster = Broadcaster(FakeBot(), rate=1000, chat_interval=0)
+    messages = [OutgoingMessage(chat_id, "hi") for chat_id in range(50)]
+    asyncio.run(broadcaster.send(messages))
+    assert len(broadcaster._chat_next) <= 10
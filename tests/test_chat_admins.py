@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from common.chat_admins import ChatAdminCache
+
+
+def _member(tele_id: int, status: str = "administrator", is_bot=False):
+    user = SimpleNamespace(id=tele_id, is_bot=is_bot, full_name=f"u{tele_id}")
+    return SimpleNamespace(status=status, user=user)
+
+
+def test_admin_names_waits_for_every_group():
+    cache = ChatAdminCache()
+    cache.set_groups([100, 200])
+    cache.set_chat(100, [_member(1)])
+    assert cache.admin_names() is None  # группа 200 ещё не получена
+    cache.set_chat(200, [_member(2), _member(3, "member")])
+    assert cache.admin_names() == {1: "u1", 2: "u2"}
+
+
+def test_other_chats_do_not_grant_rights():
+    cache = ChatAdminCache()
+    cache.set_groups([100])
+    cache.set_chat(100, [_member(1), _member(7, is_bot=True)])
+    cache.set_chat(300, [_member(5)])
+    assert cache.admin_names() == {1: "u1"}
+    assert not cache.is_group(300)
+
+
+def test_without_groups_no_chat_grants_rights():
+    cache = ChatAdminCache()
+    cache.set_chat(300, [_member(5)])
+    assert not cache.is_group(300)
+    assert cache.admin_names() is None
+
+
+def test_update_member_reports_changes():
+    cache = ChatAdminCache()
+    assert not cache.update_member(100, _member(1))  # чат не загружен
+    cache.set_chat(100, [])
+    assert cache.update_member(100, _member(1))
+    assert not cache.update_member(100, _member(1))
+    assert cache.update_member(100, _member(1, "member"))
+    assert cache.chat_admin_names(100) == {}
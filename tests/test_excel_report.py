@@ -0,0 +1,73 @@
+import asyncio
+import time
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from common import excel_report
+from common.excel_report import ReportSheet, build_report, created_month
+
+
+async def _chunks(rows, size=10):
+    for start in range(0, len(rows), size):
+        end = start + size
+        yield rows[start:end]
+
+
+def test_build_report_splits_sheets_by_month():
+    rows = [
+        (1, 10, datetime(2026, 1, 5)),
+        (2, 20, datetime(2026, 1, 6)),
+        (1, 15, datetime(2026, 2, 5)),
+    ]
+    sheet = ReportSheet(
+        "Вода", ["Кв", "Значение", "Дата"], _chunks(rows), split=created_month
+    )
+    data = asyncio.run(build_report([sheet]))
+    workbook = load_workbook(BytesIO(data.getvalue()))
+    assert workbook.sheetnames == ["Вода 01.2026", "Вода 02.2026"]
+    assert workbook["Вода 01.2026"].max_row == 3  # заголовок и две строки
+
+
+def test_writer_failure_does_not_hang_producer(monkeypatch):
+    monkeypatch.setattr(excel_report, "PUT_TIMEOUT", 0.05)
+
+    def convert(row):
+        raise ValueError("broken row")
+
+    rows = [(i, datetime(2026, 1, 1)) for i in range(1000)]
+    sheet = ReportSheet(
+        "Лист", ["Кв", "Дата"], _chunks(rows, size=1), convert=convert
+    )
+
+    async def run():
+        await asyncio.wait_for(build_report([sheet]), timeout=5)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_cancel_with_full_queue_does_not_block_loop():
+    async def endless():
+        while True:
+            yield [(1, datetime(2026, 1, 1))]
+
+    async def run():
+        # поток записи занят: очередь быстро заполняется
+        blocker = excel_report._executor.submit(time.sleep, 0.5)
+        other = excel_report._executor.submit(time.sleep, 0.5)
+        task = asyncio.create_task(
+            build_report([ReportSheet("Лист", ["Кв", "Дата"], endless())])
+        )
+        await asyncio.sleep(0.1)
+        task.cancel()
+        started = asyncio.get_running_loop().time()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert asyncio.get_running_loop().time() - started < 0.3
+        blocker.result()
+        other.result()
+
+    asyncio.run(run())
@@ -0,0 +1,117 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from dbase import fsm_storage
+from dbase.fsm_storage import SQLStorage
+from dbase.models import Base
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def _session_maker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/fsm.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+def test_state_and_data_survive_restart(tmp_path):
+    async def run():
+        engine, session_maker = await _session_maker(tmp_path)
+        storage = SQLStorage(session_maker, flush_interval=60)
+        await storage.set_state(_key(1), "Form:name")
+        await storage.set_data(_key(1), {"name": "Иван"})
+        await storage.close()
+
+        restarted = SQLStorage(session_maker)
+        state = await restarted.get_state(_key(1))
+        data = await restarted.get_data(_key(1))
+        await engine.dispose()
+        return state, data
+
+    assert asyncio.run(run()) == ("Form:name", {"name": "Иван"})
+
+
+def test_cleared_state_is_deleted(tmp_path):
+    async def run():
+        engine, session_maker = await _session_maker(tmp_path)
+        storage = SQLStorage(session_maker, flush_interval=0)
+        await storage.set_state(_key(1), "Form:name")
+        await storage.flush()
+        await storage.set_state(_key(1), None)
+        await storage.close()
+
+        restarted = SQLStorage(session_maker)
+        state = await restarted.get_state(_key(1))
+        await engine.dispose()
+        return state
+
+    assert asyncio.run(run()) is None
+
+
+def test_write_during_flush_is_not_lost(tmp_path, monkeypatch):
+    saving = asyncio.Event()
+    release = asyncio.Event()
+    save = fsm_storage.orm_save_fsm
+
+    async def slow_save(session, rows, deleted):
+        if not saving.is_set():
+            saving.set()
+            await release.wait()
+        await save(session, rows, deleted)
+
+    monkeypatch.setattr(fsm_storage, "orm_save_fsm", slow_save)
+
+    async def run():
+        engine, session_maker = await _session_maker(tmp_path)
+        storage = SQLStorage(session_maker, flush_interval=0)
+        await storage.set_state(_key(1), "Form:first")
+        await saving.wait()  # первый сброс пишет в БД
+        await storage.set_state(_key(2), "Form:second")
+        release.set()
+        for _ in range(50):  # без close(): сброс должен запуститься сам
+            await asyncio.sleep(0.01)
+            if not storage._dirty and storage._flusher.done():
+                break
+
+        restarted = SQLStorage(session_maker)
+        states = (
+            await restarted.get_state(_key(1)),
+            await restarted.get_state(_key(2)),
+        )
+        await engine.dispose()
+        return states
+
+    assert asyncio.run(run()) == ("Form:first", "Form:second")
+
+
+def test_close_during_flush_keeps_changes(tmp_path, monkeypatch):
+    calls = []
+    save = fsm_storage.orm_save_fsm
+
+    async def hanging_save(session, rows, deleted):
+        calls.append(rows)
+        if len(calls) == 1:
+            await asyncio.Event().wait()  # прерывается close()
+        await save(session, rows, deleted)
+
+    monkeypatch.setattr(fsm_storage, "orm_save_fsm", hanging_save)
+
+    async def run():
+        engine, session_maker = await _session_maker(tmp_path)
+        storage = SQLStorage(session_maker, flush_interval=0)
+        await storage.set_state(_key(1), "Form:name")
+        while not calls:
+            await asyncio.sleep(0)
+        await storage.close()
+
+        restarted = SQLStorage(session_maker)
+        state = await restarted.get_state(_key(1))
+        await engine.dispose()
+        return state
+
+    assert asyncio.run(run()) == "Form:name"
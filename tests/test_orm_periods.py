@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from common import periods
+from common.periods import months_period, period_of
+from dbase import orm_query
+from dbase.models import Base, Power
+from dbase.orm_query import orm_add_update_powers, orm_stream_energy
+
+MONTH_END = datetime(2026, 1, 31, 23, 59, 59)
+
+
+class _Clock(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return MONTH_END
+
+
+def test_period_and_created_use_one_clock(tmp_path, monkeypatch):
+    monkeypatch.setattr(orm_query, "datetime", _Clock)
+    monkeypatch.setattr(periods, "datetime", _Clock)
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_maker() as session:
+            await orm_add_update_powers(session, {12: (100, 50, 50)})
+            await orm_add_update_powers(session, {12: (110, 55, 55)})
+            power = (await session.execute(select(Power))).scalar_one()
+            report = [
+                row
+                async for chunk in orm_stream_energy(
+                    session, *months_period(2026, 1)
+                )
+                for row in chunk
+            ]
+        await engine.dispose()
+        return power, report
+
+    power, report = asyncio.run(run())
+    assert power.period == 202601
+    assert power.period == period_of(power.created)
+    assert power.t0 == 110
+    assert [row[:4] for row in report] == [(12, 110, 55, 55)]
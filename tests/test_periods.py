@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from common.periods import (
+    current_period,
+    format_period,
+    month_bounds,
+    parse_period,
+    period_months,
+    period_of,
+)
+
+NOW = datetime(2026, 1, 15, 12, 0)
+
+
+def test_month_bounds_wraps_year():
+    assert month_bounds(2025, 12) == (
+        datetime(2025, 12, 1),
+        datetime(2026, 1, 1),
+    )
+
+
+@pytest.mark.parametrize(
+    "kind, expected",
+    [
+        ("month", (datetime(2026, 1, 1), datetime(2026, 2, 1))),
+        ("prev", (datetime(2025, 12, 1), datetime(2026, 1, 1))),
+        ("quarter", (datetime(2026, 1, 1), datetime(2026, 4, 1))),
+        ("year", (datetime(2026, 1, 1), datetime(2027, 1, 1))),
+    ],
+)
+def test_current_period(kind, expected):
+    assert current_period(kind, NOW) == expected
+
+
+def test_parse_single_month_and_range():
+    assert parse_period("3.2026") == (
+        datetime(2026, 3, 1),
+        datetime(2026, 4, 1),
+    )
+    assert parse_period(" 11.2025 - 02.2026 ") == (
+        datetime(2025, 11, 1),
+        datetime(2026, 3, 1),
+    )
+
+
+@pytest.mark.parametrize(
+    "text", ["", "13.2026", "00.2026", "05.2026-04.2026", "май"]
+)
+def test_parse_rejects_bad_input(text):
+    assert parse_period(text) is None
+
+
+def test_period_helpers():
+    start, end = parse_period("11.2025-02.2026")
+    assert period_months(start, end) == 4
+    assert format_period(start, end) == "11.2025-02.2026"
+    assert format_period(*month_bounds(2026, 1)) == "01.2026"
+    assert period_of(NOW) == 202601
@@ -0,0 +1,52 @@
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from common.power_import import (
+    rows_from_csv,
+    rows_from_text,
+    rows_from_xlsx,
+    validate_power_rows,
+)
+
+
+def test_text_rows_accept_mixed_separators():
+    rows = rows_from_text("12 100 50 50\n\n13;200, 100\t100\n")
+    assert [(row.line, row.values) for row in rows] == [
+        (1, ["12", "100", "50", "50"]),
+        (3, ["13", "200", "100", "100"]),
+    ]
+
+
+def test_csv_rows_detect_delimiter():
+    rows = rows_from_csv("кв;T0;T1;T2\n12;100;50;50\n")
+    assert rows[1].values == ["12", "100", "50", "50"]
+
+
+def test_xlsx_rows_skip_empty_lines():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["кв", "T0", "T1", "T2"])
+    sheet.append([None, None, None, None])
+    sheet.append([12, 100.0, 50, 50])
+    data = BytesIO()
+    workbook.save(data)
+    rows = rows_from_xlsx(data.getvalue())
+    assert [row.line for row in rows] == [1, 3]
+    assert validate_power_rows(rows, {}).accepted == {12: (100, 50, 50)}
+
+
+def test_validation_reasons():
+    rows = rows_from_text(
+        "кв T0 T1 T2\n"  # заголовок пропускается
+        "12 100 50 50\n"
+        "12 110 55 55\n"  # повтор квартиры
+        "999 1 1 1\n"  # нет такой квартиры
+        "13 1 2\n"  # не хватает чисел
+        "14 90 60 30\n"  # меньше прошлых показаний
+        "15 10 5 5\n"
+    )
+    result = validate_power_rows(rows, {14: (100, 50, 50), 15: (None, 1, 1)})
+    assert result.accepted == {12: (100, 50, 50), 15: (10, 5, 5)}
+    assert [line for line, _ in result.rejected] == [3, 4, 5, 6]
+    assert "меньше предыдущих 100/50/50" in result.rejected[3][1]
@@ -0,0 +1,25 @@
+from common.text_normalize import normalize_text
+
+
+def test_case_and_punctuation_are_dropped():
+    assert normalize_text("Привет, Мир!") == "привет мир"
+
+
+def test_latin_homoglyphs_become_cyrillic():
+    assert normalize_text("pеkа") == "река"  # латинские p и k
+
+
+def test_digits_and_symbols_become_letters():
+    assert normalize_text("6@з0н") == "базон"
+
+
+def test_invisible_characters_and_emoji_are_removed():
+    assert normalize_text("сло​во👍") == "слово"
+
+
+def test_repeated_letters_are_collapsed():
+    assert normalize_text("ааааааа привееет") == "а привет"
+
+
+def test_yo_is_replaced_with_ye():
+    assert normalize_text("ёлка") == "елка"
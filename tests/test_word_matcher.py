@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from common.text_normalize import normalize_text
+from common.word_matcher import STEM, WordMatcher, load_exceptions
+from dbase.models import Base, Words
+from dbase.orm_query import create_restrict_words_db
+
+
+@pytest.fixture(scope="module")
+def matcher() -> WordMatcher:
+    with open("ban_words.txt", encoding="utf-8") as f:
+        words = [line for line in f if line.strip()]
+    return WordMatcher(
+        words,
+        normalize=normalize_text,
+        exceptions=load_exceptions("ban_exceptions.txt"),
+    )
+
+
+INNOCENT = [
+    "Члены правления ТСЖ",
+    "Поцелуйте детей за меня",
+    "Очков никто не находил у лифта?",
+    "Лохматый кот бегает во дворе",
+    "Мочалка забыта в душевой",
+    "Какой-то хулиган сломал домофон",
+    "Родственники приехали из Херсона, Херсон",
+    "Купил мандарины к празднику",
+    "Команда дворников придёт завтра",
+    "Поставьте spam-фильтр на почту",
+    "Оплата 300 рублей, не хватает рубля",
+    "Надо употреблять меньше воды",
+    "Ребята, хлебали суп и гребите снег",
+    "Застрахуем квартиру, я страхую машину",
+    "Пальто из сукна, суконный пиджак",
+    "Запись на педикюр в салоне",
+    "Херувим на картине, бутылка хереса",
+    "Мандат депутата, мандраж перед собранием",
+    "Добрый день, соседи! Кто знает, когда дадут горячую воду?",
+    "ЗАВТРА собрание ТСЖ в 19:00!!! Приходите все 🙏🙏🙏",
+]
+
+OFFENSIVE = [
+    "ну ты и блядь",
+    "Бля, опять лифт сломан",
+    "какой же ты лох",
+    "б.л.я.д.ь",
+    "БЛЯДЬ!!!",
+    "ну ты и 6лядь",
+    "иди нахуй",
+    "с этими блядями",
+    "пиздецкий ремонт",
+    "вы меня заебали",
+    "не будь сукой",
+    "соседи - мудаки, мудаками и останутся",
+    "хуевый лифт",
+    "распиздяи из УК",
+    "херня какая-то",
+]
+
+
+@pytest.mark.parametrize("text", INNOCENT)
+def test_innocent_messages_pass(matcher, text):
+    assert matcher.search(text) is None
+
+
+@pytest.mark.parametrize("text", OFFENSIVE)
+def test_offensive_messages_match(matcher, text):
+    assert matcher.search(text) is not None
+
+
+def test_whole_word_by_default():
+    matcher = WordMatcher(["хер"])
+    assert matcher.search("хер тебе") == "хер"
+    assert matcher.search("херсон") is None
+    assert matcher.search("нахер") is None
+
+
+def test_prefix_stem():
+    matcher = WordMatcher(["бляд*"])
+    assert matcher.search("блядский день") == "бляд*"
+    assert matcher.search("неблядский") is None
+
+
+def test_infix_stem_and_exceptions():
+    matcher = WordMatcher(["*бля*"], exceptions=["рубля"])
+    assert matcher.search("охренебля") == "*бля*"
+    assert matcher.search("без рубля") is None
+
+
+def test_add_discard_replace():
+    matcher = WordMatcher(["лох"])
+    matcher.replace("лох", "чмо")
+    assert matcher.search("лох") is None
+    assert matcher.search("чмо") == "чмо"
+    matcher.discard("чмо")
+    assert len(matcher) == 0
+    assert matcher.search("чмо") is None
+
+
+def test_find_all_positions():
+    matcher = WordMatcher(["лох", "чмо"])
+    assert matcher.find_all("лох и чмо") == [(0, "лох"), (6, "чмо")]
+
+
+# исключение -> слово, которое без исключения поймала бы основа словаря
+EXCEPTION_SAMPLES = {
+    "*страху*": "застрахуем",
+    "сукн*": "сукно",
+    "сукон*": "суконный",
+    "сукров*": "сукровица",
+    "сукулент*": "суккуленты",
+    "сукре*": "сукре",
+    "педикюр*": "педикюром",
+    "педикул*": "педикулез",
+    "херес*": "хереса",
+    "херсон*": "херсонский",
+    "херувим*": "херувимы",
+    "мандарин*": "мандарины",
+    "мандат*": "мандата",
+    "мандолин*": "мандолина",
+    "мандр*": "мандраж",
+    "мандал*": "мандала",
+    "мандельштам*": "мандельштама",
+}
+
+
+def test_every_exception_guards_an_existing_stem(matcher):
+    exceptions = load_exceptions("ban_exceptions.txt")
+    assert sorted(exceptions) == sorted(EXCEPTION_SAMPLES)
+    bare = WordMatcher(matcher, normalize=normalize_text)
+    for exception, sample in EXCEPTION_SAMPLES.items():
+        assert STEM in (bare.search(sample) or ""), exception
+        assert matcher.search(sample) is None, exception
+
+
+def test_exception_stems():
+    matcher = WordMatcher(
+        ["сук*", "*хуй*"], exceptions=["сукн*", "*страху*", "сука"]
+    )
+    assert matcher.search("сукно") is None
+    assert matcher.search("сука") is None  # исключение-слово целиком
+    assert matcher.search("сукин") == "сук*"
+    assert matcher.search("застрахуй") is None
+    assert matcher.search("нахуй") == "*хуй*"
+
+
+def test_stems_are_added_to_an_old_dictionary(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_maker() as session:
+            session.add(Words(word="лох"))
+            await session.commit()
+            await create_restrict_words_db(session)
+            first = set((await session.execute(select(Words.word))).scalars())
+            await session.execute(
+                Words.__table__.delete().where(Words.word == "сук*")
+            )
+            await session.commit()
+            await create_restrict_words_db(session)
+            second = set((await session.execute(select(Words.word))).scalars())
+        await engine.dispose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert {"лох", "*бляд*", "сук*"} <= first
+    assert "блядь" not in first  # целые слова старого словаря не трогаем
+    assert "сук*" not in second  # удалённая админом основа не вернётся